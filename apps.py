@@ -0,0 +1,24 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
+
+class CoreConfig(AppConfig):
+    name = 'core'
+
+    def ready(self):
+        from .database import apply_sqlite_pragmas
+        from .models import LandingPage
+        from .page_cache import landing_page_saved
+        from .static_export import landing_page_export_saved, remove_landing_page_export
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid="core.apply_sqlite_pragmas")
+        # حفظ الصفحة أو نشرها أو حذفها يبطل HTML المخزن لها
+        post_save.connect(landing_page_saved, sender=LandingPage, dispatch_uid="core.landing_page_saved")
+        post_delete.connect(landing_page_saved, sender=LandingPage, dispatch_uid="core.landing_page_deleted")
+        post_save.connect(
+            landing_page_export_saved, sender=LandingPage, dispatch_uid="core.landing_page_export_saved"
+        )
+        post_delete.connect(
+            remove_landing_page_export, sender=LandingPage, dispatch_uid="core.remove_landing_page_export"
+        )
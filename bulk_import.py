@@ -0,0 +1,243 @@
+import csv
+import io
+import logging
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .image_mirror import schedule_landing_page_mirroring
+from .models import LandingPage
+
+
+logger = logging.getLogger(__name__)
+
+URL_COLUMNS = ('url', 'product_url', 'link')
+
+
+def parse_url_list(text="", csv_file=None, urls=()):
+    """
+    قراءة قائمة الروابط من نص (رابط في كل سطر) أو من ملف CSV أو من قائمة جاهزة (urls).
+
+    النص يُقسم على الأسطر والمسافات فقط، لأن الفاصلة جزء صالح من الرابط (مثل ?color=red,blue).
+    في ملف CSV يتم استخدام عمود url/product_url/link إن وجد، وإلا العمود الأول.
+    الروابط المكررة أو غير الصالحة يتم تجاهلها.
+    """
+    rows = list(urls)
+    if csv_file is not None:
+        content = csv_file.read()
+        if isinstance(content, bytes):
+            content = content.decode('utf-8-sig')
+        reader = csv.reader(io.StringIO(content))
+        header = next(reader, [])
+        normalized = [column.strip().lower() for column in header]
+        column = next((normalized.index(name) for name in URL_COLUMNS if name in normalized), None)
+        if column is None:
+            # لا يوجد صف عناوين، الصف الأول هو رابط
+            column = 0
+            rows.append(header[0] if header else "")
+        rows.extend(row[column] for row in reader if len(row) > column)
+    if text:
+        rows.extend(text.split())
+
+    urls = []
+    seen = set()
+    for url in rows:
+        url = url.strip()
+        if url.startswith(("http://", "https://")) and url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+def parse_price(value):
+    """تحويل نص السعر المستخرج (مثل "1,299." أو "$19.99") إلى Decimal."""
+    match = re.search(r'\d[\d,]*(?:\.\d+)?', str(value or ''))
+    if not match:
+        return Decimal('0')
+    try:
+        return Decimal(match.group(0).replace(',', '')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return Decimal('0')
+
+
+def _scrape_url(url):
+    """استخراج بيانات المنتج، يعمل داخل خيط منفصل."""
+    # الاستيراد هنا لتجنب الاستيراد الدائري مع views
+    from .views import scrape_product_info
+
+    close_old_connections()
+    try:
+        product_info = scrape_product_info(url)
+        if product_info.get('error'):
+            return None, product_info['error']
+        return product_info, None
+    except Exception as e:
+        logger.error(f"Bulk import failed for {url}: {str(e)}", exc_info=True)
+        return None, str(e)
+    finally:
+        close_old_connections()
+
+
+def _analyze_batch(items, user):
+    """
+    تحليل دفعة من المنتجات بطلب GPT واحد. ترجع قائمة (url, product_details, error).
+
+    النص البديل (fallback) عند تعطل OpenAI يُعد فشلًا: لا تُحفظ منه صفحات متطابقة بلا محتوى حقيقي.
+    """
+    from .views import analyze_products_with_gpt_batch
+
+    close_old_connections()
+    try:
+        results = analyze_products_with_gpt_batch([product_info for _, product_info in items], user=user)
+        analyzed = []
+        for (url, product_info), gpt_data in zip(items, results):
+            if "error" in gpt_data:
+                analyzed.append((url, None, gpt_data['error']))
+            elif gpt_data.get("fallback"):
+                analyzed.append((url, None, "OpenAI is unavailable, try again later"))
+            else:
+                analyzed.append((url, {**product_info, **gpt_data, 'link': url}, None))
+        return analyzed
+    except Exception as e:
+        logger.error(f"Bulk analysis failed: {str(e)}", exc_info=True)
+        return [(url, None, str(e)) for url, _ in items]
+    finally:
+        close_old_connections()
+
+
+def build_draft(user, product_details):
+    """إنشاء صفحة هبوط غير منشورة (بدون حفظ) من بيانات المنتج المحللة."""
+    benefits = product_details.get('benefits') or []
+    if isinstance(benefits, str):
+        benefits = [benefits]
+    return LandingPage(
+        user=user,
+        title=(product_details.get('headline') or product_details.get('title') or 'Untitled')[:255],
+        description=product_details.get('subheadline', ''),
+        purchase_url=product_details['link'],
+        price=parse_price(product_details.get('price')),
+        usp=(product_details.get('usp') or '')[:255],
+        benefits=benefits,
+        cta=(product_details.get('cta') or '')[:255],
+        testimonials=[],
+        urgency=(product_details.get('urgency') or '')[:255],
+        image_urls=product_details.get('image_urls', []),
+        is_published=False,
+    )
+
+
+def _assign_unique_slugs(drafts):
+    """توليد slug فريد لكل صفحة باستعلام واحد بدلًا من استعلام لكل محاولة."""
+    bases = [slugify(draft.title[:45], allow_unicode=True) or "untitled" for draft in drafts]
+    query = Q()
+    for base in set(bases):
+        query |= Q(slug__startswith=base)
+    taken = set(LandingPage.objects.filter(query).values_list('slug', flat=True))
+
+    for draft, base in zip(drafts, bases):
+        slug = base
+        counter = 1
+        while slug in taken:
+            slug = f"{base}-{counter}"
+            counter += 1
+        taken.add(slug)
+        draft.slug = slug
+
+
+def save_drafts(drafts):
+    """حفظ دفعة من الصفحات باستعلام واحد، مع الرجوع للحفظ الفردي عند تعارض slug."""
+    _assign_unique_slugs(drafts)
+    try:
+        with transaction.atomic():
+            pages = LandingPage.objects.bulk_create(drafts)
+    except IntegrityError:
+        # تم إنشاء slug مطابق من طلب آخر في نفس اللحظة
+        logger.warning("Slug conflict during bulk import, saving drafts one by one")
+        for draft in drafts:
+            draft.pk = None
+            draft.slug = ""
+            draft.save()
+        pages = drafts
+
+    if settings.IMAGE_MIRROR_ENABLED:
+        schedule_landing_page_mirroring([page.pk for page in pages])
+    return pages
+
+
+def iter_bulk_import(user, urls, concurrency=None, batch_size=None):
+    """
+    تحليل قائمة روابط بالتوازي وحفظها كصفحات هبوط غير منشورة على دفعات.
+
+    ترجع مولّدًا يعطي حدثًا (dict) لكل رابط ولكل دفعة محفوظة، ثم ملخصًا نهائيًا.
+    """
+    concurrency = concurrency or settings.BULK_IMPORT_CONCURRENCY
+    batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+    started = time.monotonic()
+    total = len(urls)
+    done = succeeded = failed = saved = 0
+    drafts = []
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-import")
+    try:
+        # يتم الاستخراج لكل رابط على حدة، ثم تُجمع المنتجات في دفعات لتحليلها بطلب GPT واحد
+        futures = {executor.submit(_scrape_url, url): url for url in urls}
+        scraping = len(futures)
+        scraped = []
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                url = futures.pop(future)
+                if url is not None:
+                    scraping -= 1
+                    product_info, error = future.result()
+                    if error:
+                        done += 1
+                        failed += 1
+                        yield {"event": "failed", "url": url, "error": error, "done": done, "total": total}
+                    else:
+                        scraped.append((url, product_info))
+                    continue
+
+                for item_url, product_details, error in future.result():
+                    done += 1
+                    if error:
+                        failed += 1
+                        yield {"event": "failed", "url": item_url, "error": error, "done": done, "total": total}
+                    else:
+                        succeeded += 1
+                        drafts.append(build_draft(user, product_details))
+                        yield {"event": "analyzed", "url": item_url, "done": done, "total": total}
+
+                if len(drafts) >= batch_size:
+                    pages = save_drafts(drafts)
+                    saved += len(pages)
+                    yield {"event": "saved", "slugs": [page.slug for page in pages]}
+                    drafts = []
+
+            # إرسال دفعة كاملة، أو ما تبقى بعد انتهاء جميع عمليات الاستخراج
+            while len(scraped) >= settings.GPT_BATCH_SIZE or (scraped and not scraping):
+                batch, scraped = scraped[:settings.GPT_BATCH_SIZE], scraped[settings.GPT_BATCH_SIZE:]
+                futures[executor.submit(_analyze_batch, batch, user)] = None
+    finally:
+        # إلغاء الروابط المتبقية إذا توقف المستهلك (مثلًا انقطع اتصال المتصفح)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if drafts:
+        pages = save_drafts(drafts)
+        saved += len(pages)
+        yield {"event": "saved", "slugs": [page.slug for page in pages]}
+
+    yield {
+        "event": "complete",
+        "total": total,
+        "succeeded": succeeded,
+        "failed": failed,
+        "saved": saved,
+        "elapsed": round(time.monotonic() - started, 2),
+    }
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+_path = None
+_failure = None  # (وقت إعادة المحاولة، رسالة الخطأ) بعد فشل التحديد
+_lock = threading.Lock()
+
+
+class ChromeDriverNotFound(Exception):
+    """تعذر تحديد ChromeDriver: لا يوجد مسار محدد أو محفوظ، أو فشل التثبيت التلقائي."""
+
+
+def _usable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def read_manifest():
+    try:
+        with open(settings.CHROMEDRIVER_MANIFEST, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(path, seconds):
+    """حفظ المسار بشكل ذري حتى لا تقرأ العمليات الأخرى ملفًا نصف مكتوب."""
+    manifest = {
+        "path": path,
+        "resolved_at": timezone.now().isoformat(),
+        "install_seconds": round(seconds, 3),
+    }
+    temp_path = f"{settings.CHROMEDRIVER_MANIFEST}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(temp_path, settings.CHROMEDRIVER_MANIFEST)
+    return manifest
+
+
+def install_chromedriver():
+    """
+    تنزيل ChromeDriver المطابق لنسخة Chrome عبر webdriver_manager وحفظ مساره.
+    هذه هي العملية الوحيدة التي تحتاج اتصالًا بالإنترنت.
+    """
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    start = time.perf_counter()
+    with metrics.span("chromedriver.install"):
+        path = ChromeDriverManager().install()
+    seconds = time.perf_counter() - start
+    write_manifest(path, seconds)
+    logger.info(f"ChromeDriver installed in {seconds:.3f}s: {path}")
+    return path
+
+
+def resolve_chromedriver():
+    """
+    ترجع (المسار، المصدر): CHROMEDRIVER_PATH، ثم ملف manifest، ثم التثبيت إن كان مسموحًا.
+    """
+    if settings.CHROMEDRIVER_PATH:
+        if not _usable(settings.CHROMEDRIVER_PATH):
+            raise ChromeDriverNotFound(f"CHROMEDRIVER_PATH is not executable: {settings.CHROMEDRIVER_PATH}")
+        return settings.CHROMEDRIVER_PATH, "settings"
+
+    path = read_manifest().get("path")
+    if _usable(path):
+        return path, "manifest"
+
+    if not settings.CHROMEDRIVER_AUTO_INSTALL:
+        raise ChromeDriverNotFound(
+            "No ChromeDriver found. Run `manage.py resolve_chromedriver` or set CHROMEDRIVER_PATH."
+        )
+    return install_chromedriver(), "install"
+
+
+def get_chromedriver_path():
+    """
+    مسار ChromeDriver، يتم تحديده مرة واحدة لكل عملية ثم يعاد استخدامه دون أي طلب شبكة.
+
+    عند الفشل (مثلًا تثبيت بدون إنترنت) يُحفظ الخطأ لمدة CHROMEDRIVER_RETRY_AFTER، فتفشل
+    المحاولات التالية فورًا بدل أن تنتظر كل عمليات تشغيل المتصفح محاولة تثبيت جديدة.
+    """
+    global _path, _failure
+    with _lock:
+        if _path is not None:
+            return _path
+        if _failure is not None and time.monotonic() < _failure[0]:
+            raise ChromeDriverNotFound(_failure[1])
+
+        start = time.perf_counter()
+        try:
+            with metrics.span("chromedriver.resolve"):
+                path, source = resolve_chromedriver()
+        except Exception as e:
+            _failure = (time.monotonic() + settings.CHROMEDRIVER_RETRY_AFTER, f"ChromeDriver unavailable: {str(e)}")
+            logger.error(f"ChromeDriver resolution failed, retrying in {settings.CHROMEDRIVER_RETRY_AFTER}s: {str(e)}")
+            raise ChromeDriverNotFound(_failure[1]) from e
+        logger.info(f"ChromeDriver resolved from {source} in {time.perf_counter() - start:.3f}s: {path}")
+        _path = path
+        _failure = None
+        return _path
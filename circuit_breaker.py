@@ -0,0 +1,111 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import increment_shared
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    قاطع دائرة مشترك بين جميع العمليات عبر الذاكرة المؤقتة المشتركة.
+
+    بعد failure_threshold أخطاء خلال window ثانية يصبح مفتوحًا لمدة reset_timeout،
+    فيتم رفض الطلبات فورًا. بعدها يُسمح بطلب تجريبي واحد: نجاحه يغلق القاطع
+    وفشله يعيد فتحه.
+    """
+
+    def __init__(self, name, failure_threshold, window, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+
+    def _cache(self):
+        return caches[settings.CIRCUIT_BREAKER_CACHE_ALIAS]
+
+    def _key(self, suffix):
+        return f"breaker:{self.name}:{suffix}"
+
+    def _incr(self, suffix, timeout):
+        return increment_shared(self._cache(), self._key(suffix), timeout=timeout)
+
+    def _count_failure(self):
+        """
+        عد الأخطاء في نافذة ثابتة تبدأ مع أول خطأ، وليست نافذة تتجدد مع كل خطأ جديد،
+        حتى لا تتراكم الأخطاء المتفرقة إلى أن تفتح القاطع.
+        """
+        cache = self._cache()
+        now = time.time()
+        cache.add(self._key("window_started"), now, timeout=self.window)
+        started = cache.get(self._key("window_started"), now)
+        # عداد الأخطاء ينتهي مع بداية النافذة نفسها
+        return self._incr("failures", max(1, self.window - (now - started)))
+
+    def _opened_until(self):
+        try:
+            return self._cache().get(self._key("opened_until"))
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} state unavailable: {str(e)}")
+            return None
+
+    def state(self):
+        opened_until = self._opened_until()
+        if opened_until is None:
+            return "closed"
+        return "open" if time.time() < opened_until else "half_open"
+
+    def is_open(self):
+        return self.state() == "open"
+
+    def allow(self):
+        """هل يمكن إرسال طلب الآن؟ في حالة half_open يُسمح بطلب تجريبي واحد فقط."""
+        state = self.state()
+        if state == "closed":
+            return True
+        if state == "half_open" and self._cache().add(self._key("probe"), 1, timeout=self.reset_timeout):
+            return True
+        self._incr("rejected", None)
+        return False
+
+    def record_success(self):
+        # في الحالة المغلقة لا يوجد ما يُعاد ضبطه: الأخطاء تُعد داخل نافذة window وتنتهي وحدها
+        if self._opened_until() is None:
+            return
+        logger.info(f"Circuit breaker {self.name} closed")
+        self._cache().delete_many([
+            self._key("failures"), self._key("window_started"), self._key("opened_until"), self._key("probe")
+        ])
+
+    def record_failure(self):
+        try:
+            failures = self._count_failure()
+            # فشل الطلب التجريبي يعيد فتح القاطع مباشرة
+            if failures < self.failure_threshold and self._opened_until() is None:
+                return
+            cache = self._cache()
+            cache.set(self._key("opened_until"), time.time() + self.reset_timeout, timeout=None)
+            cache.delete_many([self._key("failures"), self._key("window_started"), self._key("probe")])
+            trips = self._incr("trips", None)
+            logger.warning(
+                f"Circuit breaker {self.name} opened for {self.reset_timeout}s (trip #{trips})"
+            )
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} update failed: {str(e)}")
+
+    def stats(self):
+        values = self._cache().get_many([
+            self._key("failures"), self._key("trips"), self._key("rejected"), self._key("opened_until")
+        ])
+        opened_until = values.get(self._key("opened_until"))
+        return {
+            "state": self.state(),
+            "recent_failures": values.get(self._key("failures"), 0),
+            "trips": values.get(self._key("trips"), 0),
+            "rejected": values.get(self._key("rejected"), 0),
+            "retry_in": max(0, round(opened_until - time.time(), 1)) if opened_until else 0,
+        }
@@ -0,0 +1,20 @@
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    تطبيق PRAGMAS المحددة في إعدادات قاعدة البيانات عند فتح كل اتصال SQLite جديد.
+
+    journal_mode=WAL يسمح بالقراءة أثناء الكتابة، وbusy_timeout يجعل الكاتب ينتظر
+    القفل بدلًا من الفشل فورًا بخطأ "database is locked".
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in (connection.settings_dict.get('PRAGMAS') or {}).items():
+        try:
+            connection.connection.execute(f"PRAGMA {name}={value}")
+        except Exception as e:
+            logger.warning(f"Could not apply PRAGMA {name}={value}: {str(e)}")
@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import random
+import threading
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_POOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_copy_pool.json')
+
+COPY_KEYS = ('title', 'price', 'headline', 'subheadline', 'usp', 'benefits', 'cta', 'testimonial', 'urgency')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_path():
+    return settings.DEFAULT_COPY_POOL_PATH or BUNDLED_POOL_PATH
+
+
+def is_valid_variant(variant):
+    return isinstance(variant, dict) and all(variant.get(key) for key in COPY_KEYS)
+
+
+def load_default_copy_pool():
+    """
+    قراءة مجموعة النصوص الافتراضية مرة واحدة لكل عملية.
+    إذا كان الملف المحدد غير صالح يتم استخدام الملف المرفق مع التطبيق.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            for path in dict.fromkeys([pool_path(), BUNDLED_POOL_PATH]):
+                try:
+                    with open(path, encoding='utf-8') as handle:
+                        variants = [variant for variant in json.load(handle) if is_valid_variant(variant)]
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not load default copy pool {path}: {str(e)}")
+                    continue
+                if variants:
+                    _pool = variants
+                    break
+            else:
+                _pool = []
+        return _pool
+
+
+def pick_default_copy():
+    """نسخة عشوائية من النصوص الافتراضية الجاهزة، دون أي استدعاء لـ GPT."""
+    pool = load_default_copy_pool()
+    return dict(random.choice(pool)) if pool else {}
+
+
+def write_default_copy_pool(variants, path=None):
+    """حفظ المجموعة بشكل ذري حتى لا تقرأ العمليات الأخرى ملفًا نصف مكتوب."""
+    path = path or pool_path()
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(variants, handle, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+    global _pool
+    with _pool_lock:
+        _pool = None
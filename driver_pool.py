@@ -0,0 +1,179 @@
+import logging
+import queue
+import random
+import threading
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+class DriverPoolExhausted(Exception):
+    """لا يوجد متصفح متاح في المجموعة خلال المهلة المحددة."""
+
+
+class _PooledDriver:
+    """غلاف بسيط يحتفظ بالمتصفح وعدد الصفحات التي فتحها."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.broken = False
+
+
+class DriverPool:
+    """
+    مجموعة محدودة وآمنة للخيوط من متصفحات Chrome الجاهزة لإعادة الاستخدام.
+
+    كل متصفح يُعاد ضبطه (الكوكيز، User-Agent، التبويبات) قبل تسليمه، ويتم
+    استبداله بعد عدد معين من الصفحات أو عند تعطله.
+    """
+
+    def __init__(self, factory, max_size=2, max_pages=50, acquire_timeout=120, user_agents=None):
+        self._factory = factory
+        self._max_size = max_size
+        self._max_pages = max_pages
+        self._acquire_timeout = acquire_timeout
+        self._user_agents = user_agents or []
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._leased = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # ============================
+    def warm(self, count=None):
+        """تشغيل عدد من المتصفحات مسبقًا حتى لا يدفع الطلب الأول تكلفة التشغيل."""
+        count = min(count or self._max_size, self._max_size)
+        started = []
+        for _ in range(count):
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                started.append(self._launch())
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Error warming driver pool: {str(e)}")
+                break
+        for entry in started:
+            self._idle.put(entry)
+            self._slots.release()
+        return len(started)
+
+    # ============================
+    @contextmanager
+    def lease(self):
+        """
+        استعارة متصفح من المجموعة، مع إعادته تلقائيًا عند الانتهاء.
+        """
+        entry = self._acquire()
+        try:
+            yield entry.driver
+        except WebDriverException as e:
+            # انتهاء مهلة التحميل لا يعني أن المتصفح نفسه معطّل
+            if not isinstance(e, TimeoutException):
+                entry.broken = True
+            raise
+        finally:
+            self._release(entry)
+
+    def discard(self, driver):
+        """تعليم المتصفح كمعطّل ليتم إغلاقه بدلًا من إعادته للمجموعة."""
+        with self._lock:
+            entry = self._leased.get(id(driver))
+        if entry is not None:
+            entry.broken = True
+
+    def close(self):
+        """إغلاق جميع المتصفحات الخاملة في المجموعة."""
+        self._closed = True
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(entry)
+
+    def stats(self):
+        with self._lock:
+            leased = len(self._leased)
+        return {
+            "max_size": self._max_size,
+            "idle": self._idle.qsize(),
+            "leased": leased,
+        }
+
+    # ============================
+    def _acquire(self):
+        if self._closed:
+            raise DriverPoolExhausted("Driver pool is closed")
+        with metrics.span("driver.lease"):
+            acquired = self._slots.acquire(timeout=self._acquire_timeout)
+        if not acquired:
+            raise DriverPoolExhausted(
+                f"No browser became available within {self._acquire_timeout}s"
+            )
+        try:
+            entry = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._leased[id(entry.driver)] = entry
+        return entry
+
+    def _checkout(self):
+        # إعادة استخدام متصفح خامل إن أمكن، وإلا تشغيل متصفح جديد
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return self._launch()
+            try:
+                self._reset(entry.driver)
+                return entry
+            except Exception as e:
+                logger.warning(f"Discarding unhealthy pooled driver: {str(e)}")
+                self._quit(entry)
+
+    def _release(self, entry):
+        with self._lock:
+            self._leased.pop(id(entry.driver), None)
+        entry.pages += 1
+        try:
+            if entry.broken or self._closed:
+                self._quit(entry)
+            elif self._max_pages and entry.pages >= self._max_pages:
+                logger.info(f"Recycling driver after {entry.pages} pages")
+                self._quit(entry)
+            else:
+                self._idle.put(entry)
+        finally:
+            self._slots.release()
+
+    def _launch(self):
+        return _PooledDriver(self._factory())
+
+    def _reset(self, driver):
+        """إعادة المتصفح إلى حالة نظيفة قبل استخدامه لصفحة جديدة."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+        # delete_all_cookies() يحذف كوكيز الصفحة الحالية فقط (about:blank لا شيء)، أما CDP فيحذف كل الكوكيز
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        if self._user_agents:
+            driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+                "userAgent": random.choice(self._user_agents)
+            })
+
+    def _quit(self, entry):
+        try:
+            entry.driver.quit()
+        except Exception as e:
+            logger.error(f"Error closing driver: {str(e)}")
@@ -0,0 +1,25 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+def lazy_executor(workers_setting, thread_name_prefix):
+    """
+    ترجع دالة تعطي ThreadPoolExecutor مشتركًا داخل العملية، يُنشأ عند أول استدعاء
+    (بعد تحميل الإعدادات، وبعد fork في الخوادم متعددة العمليات) بعدد خيوط من workers_setting.
+    """
+    executor = None
+    lock = threading.Lock()
+
+    def get_executor():
+        nonlocal executor
+        with lock:
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, workers_setting),
+                    thread_name_prefix=thread_name_prefix,
+                )
+            return executor
+
+    return get_executor
@@ -0,0 +1,175 @@
+import fnmatch
+import time
+from urllib.parse import urljoin, urlparse
+
+
+# ============================
+# سجل المستخرجات لكل موقع
+# ============================
+# كل حقل له قائمة محددات CSS مرتبة حسب الأولوية، ويتم تقييمها جميعًا في تمريرة
+# واحدة؛ أول محدد يعطي قيمة هو المعتمد. المحدد إما نص CSS (لقراءة النص) أو
+# (CSS، اسم الخاصية) لقراءة خاصية مثل src أو content.
+
+EXTRACTORS = {}
+
+
+def register_extractor(name, domains, fields, required=('title', 'price')):
+    """
+    تسجيل مستخرج لموقع جديد دون تعديل مسار الاستخراج نفسه.
+
+    domains: أنماط أسماء النطاقات (مثل "amazon.*").
+    fields: {اسم الحقل: {"selectors": [...], "many": عدد القيم أو 0، "url": bool}}
+    required: الحقول التي يعتبر غيابها فشلًا في الاستخراج.
+    """
+    normalized = {}
+    for field, spec in fields.items():
+        normalized[field] = {
+            "selectors": [
+                [selector, None] if isinstance(selector, str) else list(selector)
+                for selector in spec["selectors"]
+            ],
+            "many": spec.get("many", 0),
+            "url": spec.get("url", False),
+        }
+    EXTRACTORS[name] = {
+        "name": name,
+        "domains": tuple(domains),
+        "fields": normalized,
+        "required": tuple(required),
+    }
+
+
+register_extractor(
+    "amazon",
+    domains=["amazon.*", "*.amazon.*"],
+    fields={
+        "title": {"selectors": ["#productTitle", "#title"]},
+        "price": {"selectors": [
+            ".a-price-whole",
+            "#priceblock_ourprice",
+            "#priceblock_dealprice",
+            "#corePriceDisplay_desktop_feature_div .a-offscreen",
+        ]},
+        "image_urls": {
+            "selectors": [
+                ("#main-image-container img", "src"),
+                ("#main-image-container img", "data-old-hires"),
+            ],
+            "many": 5,
+            "url": True,
+        },
+        "reviews": {"selectors": ['[data-hook="review-collapsed"]'], "many": 3},
+    },
+    required=("title", "price", "image_urls"),
+)
+
+# مستخرج عام للمتاجر الأخرى يعتمد على بيانات Open Graph و schema.org
+register_extractor(
+    "default",
+    domains=[],
+    fields={
+        "title": {"selectors": [("meta[property='og:title']", "content"), "h1"]},
+        "price": {"selectors": [
+            ("meta[property='product:price:amount']", "content"),
+            ("[itemprop='price']", "content"),
+            "[itemprop='price']",
+            ".price",
+        ]},
+        "image_urls": {
+            "selectors": [("meta[property='og:image']", "content"), ("[itemprop='image']", "src")],
+            "many": 5,
+            "url": True,
+        },
+        "reviews": {"selectors": ["[itemprop='reviewBody']"], "many": 3},
+    },
+)
+
+
+def get_extractor(url, name=None):
+    """اختيار المستخرج المناسب حسب نطاق الرابط، أو حسب الاسم إن تم تحديده."""
+    if name:
+        return EXTRACTORS[name]
+    host = urlparse(url).netloc.lower().split(':')[0]
+    for extractor in EXTRACTORS.values():
+        if any(fnmatch.fnmatch(host, pattern) for pattern in extractor["domains"]):
+            return extractor
+    return EXTRACTORS["default"]
+
+
+def missing_fields(fields, extractor):
+    """الحقول المطلوبة التي لم يتم العثور عليها."""
+    return [name for name in extractor["required"] if not fields.get(name)]
+
+
+# ============================
+# الاستخراج من HTML ثابت (BeautifulSoup)
+# ============================
+
+def _clean(value):
+    return " ".join((value or "").split())
+
+
+def extract_from_soup(soup, extractor, base_url=""):
+    fields = {}
+    for field, spec in extractor["fields"].items():
+        values = []
+        for selector, attribute in spec["selectors"]:
+            for node in soup.select(selector):
+                value = _clean(node.get(attribute) if attribute else node.get_text())
+                if not value or value.startswith("data:"):
+                    continue
+                if spec["url"]:
+                    value = urljoin(base_url, value)
+                if value not in values:
+                    values.append(value)
+                if spec["many"] and len(values) >= spec["many"]:
+                    break
+                if not spec["many"]:
+                    break
+            if values:
+                break
+        fields[field] = values if spec["many"] else (values[0] if values else None)
+    return fields
+
+
+# ============================
+# الاستخراج من المتصفح (Selenium) بسكربت واحد
+# ============================
+
+EXTRACT_SCRIPT = """
+const fields = arguments[0];
+const result = {};
+for (const [name, spec] of Object.entries(fields)) {
+    const values = [];
+    for (const [selector, attribute] of spec.selectors) {
+        let nodes;
+        try { nodes = document.querySelectorAll(selector); } catch (e) { continue; }
+        for (const node of nodes) {
+            let value = attribute ? node.getAttribute(attribute) : (node.innerText || node.textContent);
+            value = (value || "").replace(/\\s+/g, " ").trim();
+            if (!value || value.startsWith("data:")) continue;
+            if (spec.url) {
+                try { value = new URL(value, document.baseURI).href; } catch (e) { continue; }
+            }
+            if (!values.includes(value)) values.push(value);
+            if (!spec.many || values.length >= spec.many) break;
+        }
+        if (values.length) break;
+    }
+    result[name] = spec.many ? values : (values[0] || null);
+}
+return result;
+"""
+
+
+def extract_with_driver(driver, extractor, deadline, poll_interval=0.25):
+    """
+    تقييم جميع المحددات في الصفحة دفعة واحدة وإعادة المحاولة حتى تظهر الحقول
+    المطلوبة أو تنتهي المهلة الإجمالية، بدلًا من انتظار كل محدد على حدة.
+    """
+    end = time.monotonic() + deadline
+    while True:
+        fields = driver.execute_script(EXTRACT_SCRIPT, extractor["fields"]) or {}
+        if not missing_fields(fields, extractor) or time.monotonic() >= end:
+            return fields
+        time.sleep(poll_interval)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from .metrics import increment_shared
+from .models import GPTResponseCache
+
+
+logger = logging.getLogger(__name__)
+
+# يجب زيادة هذا الرقم عند تغيير شكل الرد المتوقع من GPT (مثل إضافة مفتاح جديد)
+SCHEMA_VERSION = 1
+
+STATS_KEYS = ('hits', 'misses', 'stores', 'evictions')
+
+
+def _stats_cache():
+    return caches[settings.GPT_CACHE_STATS_ALIAS]
+
+
+def gpt_cache_key(model, messages, temperature, max_tokens):
+    """بصمة الطلب: نفس النموذج والتعليمات والإعدادات تعطي نفس المفتاح."""
+    payload = json.dumps({
+        "schema": SCHEMA_VERSION,
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _incr(name, amount=1):
+    try:
+        increment_shared(_stats_cache(), f"gpt:v{SCHEMA_VERSION}:stats:{name}", amount)
+    except Exception as e:
+        logger.warning(f"GPT cache counter update failed: {str(e)}")
+
+
+def get_cached_response(key):
+    """إرجاع رد GPT المخزن لهذا المفتاح أو None، مع تحديث وقت آخر استخدام."""
+    if not settings.GPT_CACHE_ENABLED:
+        return None
+    try:
+        response = GPTResponseCache.objects.filter(pk=key).values_list('response', flat=True).first()
+        if response is None:
+            _incr('misses')
+            return None
+        GPTResponseCache.objects.filter(pk=key).update(
+            hits=F('hits') + 1, last_used_at=timezone.now()
+        )
+    except DatabaseError as e:
+        logger.error(f"GPT cache read failed: {str(e)}")
+        return None
+
+    _incr('hits')
+    return response
+
+
+def store_response(key, model, response):
+    """حفظ رد GPT ثم حذف أقدم الردود استخدامًا إذا تجاوز العدد الحد الأقصى."""
+    if not settings.GPT_CACHE_ENABLED:
+        return
+    try:
+        GPTResponseCache.objects.update_or_create(
+            key=key,
+            defaults={'model': model, 'response': response, 'last_used_at': timezone.now()},
+        )
+        _incr('stores')
+        _evict()
+    except DatabaseError as e:
+        logger.error(f"GPT cache write failed: {str(e)}")
+
+
+def _evict():
+    excess = GPTResponseCache.objects.count() - settings.GPT_CACHE_MAX_ENTRIES
+    if excess <= 0:
+        return
+    stale = list(
+        GPTResponseCache.objects.order_by('last_used_at').values_list('pk', flat=True)[:excess]
+    )
+    GPTResponseCache.objects.filter(pk__in=stale).delete()
+    _incr('evictions', len(stale))
+
+
+def gpt_cache_stats():
+    """عدادات الإصابة والإخفاق وعدد الردود المخزنة."""
+    keys = {name: f"gpt:v{SCHEMA_VERSION}:stats:{name}" for name in STATS_KEYS}
+    values = _stats_cache().get_many(list(keys.values()))
+    stats = {name: values.get(key, 0) for name, key in keys.items()}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    stats['entries'] = GPTResponseCache.objects.count()
+    return stats
@@ -0,0 +1,149 @@
+import logging
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import GPTCallRecord
+
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+
+def _encoding(model):
+    if model not in _encodings:
+        try:
+            # tiktoken اختيارية وبطيئة التحميل: بدونها يتم تقدير عدد التوكنات من طول النص
+            import tiktoken
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except ImportError:
+            _encodings[model] = None
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable for {model}, using estimates: {str(e)}")
+            _encodings[model] = None
+    return _encodings[model]
+
+
+# ============================
+# تقدير التوكنات
+# ============================
+
+def estimate_tokens(text, model="gpt-3.5-turbo"):
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, budget, model="gpt-3.5-turbo"):
+    """قص النص إلى عدد التوكنات المحدد (عند حدود الكلمات قدر الإمكان)."""
+    text = " ".join((text or "").split())
+    if budget <= 0:
+        return ""
+    if estimate_tokens(text, model) <= budget:
+        return text
+
+    encoding = _encoding(model)
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text)[:budget])
+    else:
+        cut = text[:budget * CHARS_PER_TOKEN]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut + "…"
+
+
+# ============================
+# تسجيل الاستدعاءات
+# ============================
+
+class UsageTotals:
+    """مجموع التوكنات عبر عدة محاولات لنفس التحليل."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, usage):
+        self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+        self.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+
+def call_cost(model, prompt_tokens, completion_tokens):
+    """التكلفة بالدولار حسب GPT_PRICING (سعر كل 1000 توكن للمدخلات والمخرجات)."""
+    input_price, output_price = settings.GPT_PRICING.get(model, (0, 0))
+    cost = (
+        Decimal(str(input_price)) * prompt_tokens + Decimal(str(output_price)) * completion_tokens
+    ) / 1000
+    return cost.quantize(Decimal('0.000001'))
+
+
+def record_gpt_call(model, mode, usage=None, latency=0.0, retries=0, user=None,
+                    success=True, cached=False, truncated=False, items=1):
+    """
+    حفظ سجل استدعاء واحد. لا يرفع أي استثناء حتى لا يؤثر على التحليل نفسه.
+    للاستدعاءات الفعلية فقط: الإصابات في ذاكرة الردود تُعد في عدادات gpt_cache_stats()
+    حتى لا يصبح أرخص مسار عملية كتابة في قاعدة البيانات.
+    """
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    try:
+        GPTCallRecord.objects.create(
+            user=user if getattr(user, 'is_authenticated', False) else None,
+            model=model,
+            mode=mode,
+            items=items,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=int(latency * 1000),
+            retries=retries,
+            success=success,
+            cached=cached,
+            truncated=truncated,
+            cost=call_cost(model, prompt_tokens, completion_tokens),
+        )
+    except DatabaseError as e:
+        logger.warning(f"Could not record GPT call: {str(e)}")
+
+
+# ============================
+# التجميع
+# ============================
+
+def _rollup(queryset):
+    return queryset.annotate(
+        calls=Count('id'),
+        failures=Count('id', filter=Q(success=False)),
+        truncated_calls=Count('id', filter=Q(truncated=True)),
+        total_prompt_tokens=Sum('prompt_tokens'),
+        total_completion_tokens=Sum('completion_tokens'),
+        max_completion_tokens=Max('completion_tokens'),
+        avg_latency_ms=Avg('latency_ms', filter=Q(cached=False)),
+        total_retries=Sum('retries'),
+        total_cost=Sum('cost'),
+    )
+
+
+def _since(days):
+    return GPTCallRecord.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+
+
+def usage_by_day(days=7):
+    """الاستهلاك اليومي لآخر عدد من الأيام."""
+    return list(_rollup(
+        _since(days).annotate(day=TruncDate('created_at')).values('day')
+    ).order_by('-day'))
+
+
+def usage_by_user(days=7):
+    """الاستهلاك لكل مستخدم لآخر عدد من الأيام، الأعلى تكلفة أولًا."""
+    return list(_rollup(_since(days).values('user__username')).order_by('-total_cost'))
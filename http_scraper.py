@@ -0,0 +1,105 @@
+import logging
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from django.conf import settings
+
+from . import metrics
+from .extractors import extract_from_soup, get_extractor, missing_fields
+
+
+logger = logging.getLogger(__name__)
+
+# استخدام lxml إن كان مثبتًا لأنه أسرع بكثير من المحلل المدمج
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# علامات صفحة التحقق (CAPTCHA) التي تعيدها أمازون للطلبات الآلية
+BLOCKED_PAGE_MARKERS = (
+    "/errors/validateCaptcha",
+    "Enter the characters you see below",
+    "api-services-support@amazon.com",
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    جلسة requests مشتركة مع مجموعة اتصالات يعاد استخدامها بين الطلبات.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=settings.SCRAPER_HTTP_POOL_SIZE,
+                pool_maxsize=settings.SCRAPER_HTTP_POOL_SIZE,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+            })
+            _session = session
+        return _session
+
+
+def scrape_product_info_static(url, user_agents, extractor=None):
+    """
+    محاولة استخراج بيانات المنتج من HTML الثابت عبر طلب HTTP عادي.
+
+    تُرجع None إذا كانت الصفحة محجوبة أو تنقصها العناصر الأساسية،
+    وعندها يجب الرجوع إلى Selenium. يمكن تمرير extractor لتجاوز اختياره حسب النطاق.
+    """
+    domain = metrics.domain_of(url)
+    try:
+        with metrics.span("http.fetch", domain):
+            response = get_http_session().get(
+                url,
+                headers={"User-Agent": random.choice(user_agents)},
+                timeout=settings.SCRAPER_HTTP_TIMEOUT,
+            )
+    except RequestException as e:
+        logger.warning(f"Static fetch failed for {url}: {str(e)}")
+        return None
+
+    if response.status_code != 200:
+        logger.info(f"Static fetch returned {response.status_code} for {url}")
+        return None
+
+    html = response.text
+    if any(marker in html for marker in BLOCKED_PAGE_MARKERS):
+        logger.info(f"Static fetch hit a captcha page for {url}")
+        return None
+
+    # الاستيراد هنا حتى لا يدفع إقلاع العامل وقت تحميل bs4
+    from bs4 import BeautifulSoup
+
+    extractor = extractor or get_extractor(url)
+    with metrics.span("http.parse", domain):
+        soup = BeautifulSoup(html, HTML_PARSER)
+        fields = extract_from_soup(soup, extractor, base_url=response.url)
+
+    missing = missing_fields(fields, extractor)
+    if missing:
+        logger.info(f"Static HTML is missing {', '.join(missing)} for {url}")
+        return None
+
+    return {
+        'title': fields.get('title') or 'N/A',
+        'price': fields.get('price') or 'Price not found',
+        'reviews': fields.get('reviews') or [],
+        'image_urls': fields.get('image_urls') or [],
+        'error': None,
+        'source': 'http',
+        'bytes_transferred': len(response.content),
+    }
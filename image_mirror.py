@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import time
+from io import BytesIO
+
+from requests.exceptions import RequestException
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .executors import lazy_executor
+from .http_scraper import get_http_session
+from .models import LandingPage
+from .page_cache import invalidate_landing_page
+from .static_export import refresh_landing_page_export
+
+
+logger = logging.getLogger(__name__)
+
+MIRROR_PREFIX = "product_images/mirror"
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+_pil_image = False  # False = لم يتم الاستيراد بعد
+
+
+def _image_module():
+    """
+    PIL.Image عند أول صورة وليس عند استيراد الوحدة (views تستوردها عبر jobs).
+    Pillow اختيارية: بدونها يتم حفظ الصورة الأصلية فقط دون نسخ مصغرة.
+    """
+    global _pil_image
+    if _pil_image is False:
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        _pil_image = Image
+    return _pil_image
+
+
+get_mirror_executor = lazy_executor("IMAGE_MIRROR_WORKERS", "image-mirror")
+
+
+def _download(url):
+    """تنزيل الصورة عبر جلسة HTTP المشتركة مع حد أقصى للحجم."""
+    try:
+        with get_http_session().get(url, timeout=settings.SCRAPER_HTTP_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+            if not content_type.startswith("image/"):
+                logger.warning(f"Skipping non-image response for {url}: {content_type}")
+                return None, None
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data.extend(chunk)
+                if len(data) > settings.IMAGE_MIRROR_MAX_BYTES:
+                    logger.warning(f"Skipping oversized image: {url}")
+                    return None, None
+            return bytes(data), content_type
+    except RequestException as e:
+        logger.warning(f"Image download failed for {url}: {str(e)}")
+        return None, None
+
+
+def _store(name, data):
+    """حفظ الملف باسم مبني على محتواه، دون إعادة كتابته إن كان موجودًا."""
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return default_storage.url(name)
+
+
+def _encode(image, fmt, **options):
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def mirror_image(url):
+    """
+    تنزيل صورة واحدة وحفظها محليًا مع نسخ WebP/JPEG بعدة عروض.
+
+    ترجع dict يحتوي الرابط المحلي وقيم srcset، أو None عند الفشل.
+    """
+    data, content_type = _download(url)
+    if not data:
+        return None
+
+    digest = hashlib.sha256(data).hexdigest()[:32]
+
+    Image = _image_module()
+    if Image is None:
+        extension = CONTENT_TYPE_EXTENSIONS.get(content_type, "img")
+        local_url = _store(f"{MIRROR_PREFIX}/{digest}.{extension}", data)
+        return {"src": local_url, "original": url, "width": None, "srcset": "", "webp_srcset": ""}
+
+    try:
+        image = Image.open(BytesIO(data))
+        image.load()
+    except Exception as e:
+        logger.warning(f"Could not decode image {url}: {str(e)}")
+        return None
+
+    # JPEG لا يدعم الشفافية، لذلك ندمج الصورة على خلفية بيضاء
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        flattened = Image.new("RGB", image.size, (255, 255, 255))
+        flattened.paste(image, mask=image.split()[-1])
+    else:
+        flattened = image.convert("RGB")
+
+    widths = sorted({min(width, image.width) for width in settings.IMAGE_VARIANT_WIDTHS})
+    jpeg_srcset = []
+    webp_srcset = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = flattened if width == image.width else flattened.resize((width, height), Image.LANCZOS)
+        jpeg_url = _store(
+            f"{MIRROR_PREFIX}/{digest}-{width}.jpg",
+            _encode(resized, "JPEG", quality=82, optimize=True, progressive=True),
+        )
+        webp_url = _store(
+            f"{MIRROR_PREFIX}/{digest}-{width}.webp",
+            _encode(resized, "WEBP", quality=80, method=4),
+        )
+        jpeg_srcset.append((jpeg_url, width))
+        webp_srcset.append((webp_url, width))
+
+    return {
+        "src": jpeg_srcset[-1][0],
+        "original": url,
+        "width": widths[-1],
+        "srcset": ", ".join(f"{src} {width}w" for src, width in jpeg_srcset),
+        "webp_srcset": ", ".join(f"{src} {width}w" for src, width in webp_srcset),
+    }
+
+
+def _merge_results(image_urls, results):
+    """
+    ترجع (image_urls, image_variants): الروابط المحلية بنفس الترتيب، ومعلومات srcset
+    لكل صورة. الصور التي فشل نسخها تبقى بروابطها الأصلية.
+    """
+    local_urls = []
+    variants = []
+    for url, mirrored in zip(image_urls, results):
+        if mirrored is None:
+            mirrored = {"src": url, "original": url, "width": None, "srcset": "", "webp_srcset": ""}
+        local_urls.append(mirrored["src"])
+        variants.append(mirrored)
+    return local_urls, variants
+
+
+def submit_image_mirroring(image_urls):
+    """بدء نسخ الصور في الخلفية دون انتظار، لتعمل بالتوازي مع تحليل GPT."""
+    executor = get_mirror_executor()
+    return [executor.submit(mirror_image, url) for url in image_urls]
+
+
+def collect_mirrored_images(image_urls, futures, timeout):
+    """
+    جمع نتائج النسخ خلال المهلة المحددة؛ الصور غير الجاهزة تبقى بروابطها الأصلية.
+    """
+    deadline = time.monotonic() + timeout
+    results = []
+    for url, future in zip(image_urls, futures):
+        try:
+            results.append(future.result(timeout=max(0, deadline - time.monotonic())))
+        except Exception as e:
+            logger.warning(f"Image mirroring not ready for {url}: {str(e) or type(e).__name__}")
+            results.append(None)
+    return _merge_results(image_urls, results)
+
+
+def mirror_landing_page_images(page_id):
+    """نسخ صور صفحة هبوط محفوظة وتحديث روابطها في قاعدة البيانات."""
+    close_old_connections()
+    try:
+        page = LandingPage.objects.only("image_urls", "slug", "is_published").get(pk=page_id)
+        if not any(url.startswith(("http://", "https://")) for url in page.image_urls):
+            return
+        # هذه الدالة تعمل داخل مجموعة الخيوط نفسها، لذلك ننسخ الصور بالتتابع
+        image_urls, image_variants = _merge_results(page.image_urls, [
+            mirror_image(url) if url.startswith(("http://", "https://")) else None
+            for url in page.image_urls
+        ])
+        LandingPage.objects.filter(pk=page_id).update(
+            image_urls=image_urls,
+            image_variants=image_variants,
+            updated_at=timezone.now(),
+        )
+        # update() لا يرسل post_save ولا يحدّث auto_now
+        invalidate_landing_page(page.slug)
+        if page.is_published:
+            # الصفحة نُشرت قبل انتهاء نسخ الصور: النسخة الثابتة ما زالت تستخدم الروابط الخارجية
+            refresh_landing_page_export(LandingPage.objects.get(pk=page_id))
+    except LandingPage.DoesNotExist:
+        pass
+    except Exception as e:
+        logger.error(f"Image mirroring failed for landing page {page_id}: {str(e)}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def schedule_landing_page_mirroring(page_ids):
+    executor = get_mirror_executor()
+    for page_id in page_ids:
+        executor.submit(mirror_landing_page_images, page_id)
@@ -0,0 +1,141 @@
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .executors import lazy_executor
+from .image_mirror import collect_mirrored_images, submit_image_mirroring
+from .models import ProductAnalysisJob
+
+
+logger = logging.getLogger(__name__)
+
+# مجموعة الخيوط التي تنفذ مهام تحليل المنتجات داخل عملية الويب
+get_job_executor = lazy_executor("PRODUCT_JOB_WORKERS", "product-job")
+
+
+def create_product_job(user, product_url, force_refresh=False):
+    """
+    إنشاء مهمة جديدة وجدولتها بعد حفظها في قاعدة البيانات.
+    """
+    job = ProductAnalysisJob.objects.create(
+        user=user, product_url=product_url, force_refresh=force_refresh
+    )
+    transaction.on_commit(lambda: enqueue_product_job(job.pk))
+    return job
+
+
+def enqueue_product_job(job_id):
+    get_job_executor().submit(run_product_job, job_id)
+
+
+def claim_product_job(job_id):
+    """
+    حجز المهمة بشكل ذري حتى لا ينفذها عاملان في نفس الوقت.
+    """
+    claimed = ProductAnalysisJob.objects.filter(
+        pk=job_id, status=ProductAnalysisJob.STATUS_PENDING
+    ).update(status=ProductAnalysisJob.STATUS_RUNNING, started_at=timezone.now(), updated_at=timezone.now())
+    return claimed == 1
+
+
+@contextmanager
+def job_heartbeat(job_id):
+    """
+    تحديث updated_at كل PRODUCT_JOB_HEARTBEAT_INTERVAL أثناء التنفيذ، لأن الاستخراج وحده قد يستغرق
+    عدة دقائق (3 محاولات بمهلة تحميل طويلة) ولا يجوز أن تُعاد مهمة ما زالت تعمل إلى الانتظار.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.PRODUCT_JOB_HEARTBEAT_INTERVAL):
+                ProductAnalysisJob.objects.filter(
+                    pk=job_id, status=ProductAnalysisJob.STATUS_RUNNING
+                ).update(updated_at=timezone.now())
+        except Exception as e:
+            logger.warning(f"Heartbeat for product job {job_id} stopped: {str(e)}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name="product-job-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+
+
+def requeue_stale_jobs():
+    """
+    إعادة المهام العالقة في حالة RUNNING (مثلًا بعد إعادة تشغيل الخادم) إلى الانتظار.
+    المهمة عالقة إذا توقفت نبضاتها (job_heartbeat)، وليس لأن تنفيذها طال.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.PRODUCT_JOB_STALE_AFTER)
+    return ProductAnalysisJob.objects.filter(
+        status=ProductAnalysisJob.STATUS_RUNNING, updated_at__lt=cutoff
+    ).update(status=ProductAnalysisJob.STATUS_PENDING, started_at=None)
+
+
+def _finish_job(job_id, status, result=None, error=""):
+    ProductAnalysisJob.objects.filter(pk=job_id).update(
+        status=status,
+        result=result or {},
+        error=error,
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def run_product_job(job_id):
+    """
+    تنفيذ المهمة: استخراج بيانات المنتج ثم تحليلها بـ GPT ودمج النتيجة.
+    """
+    close_old_connections()
+    try:
+        if not claim_product_job(job_id):
+            return
+        with job_heartbeat(job_id):
+            _execute_product_job(job_id)
+
+    except Exception as e:
+        logger.error(f"Product job {job_id} failed: {str(e)}", exc_info=True)
+        _finish_job(job_id, ProductAnalysisJob.STATUS_FAILED, error=str(e))
+    finally:
+        close_old_connections()
+
+
+def _execute_product_job(job_id):
+    # الاستيراد هنا لتجنب الاستيراد الدائري مع views
+    from .views import scrape_product_info, analyze_product_with_gpt
+
+    job = ProductAnalysisJob.objects.get(pk=job_id)
+
+    product_info = scrape_product_info(job.product_url)
+    if product_info.get('error'):
+        _finish_job(job_id, ProductAnalysisJob.STATUS_FAILED, error=product_info['error'])
+        return
+
+    # نسخ الصور محليًا بالتوازي مع تحليل GPT حتى لا يضيف وقتًا للمهمة
+    image_urls = product_info.get('image_urls', [])
+    mirror_futures = submit_image_mirroring(image_urls) if settings.IMAGE_MIRROR_ENABLED else []
+
+    gpt_data = analyze_product_with_gpt(product_info, force_refresh=job.force_refresh, user=job.user)
+    if "error" in gpt_data:
+        _finish_job(job_id, ProductAnalysisJob.STATUS_FAILED, error=gpt_data['error'])
+        return
+
+    merged_data = {
+        **product_info,
+        **gpt_data,
+        'link': job.product_url
+    }
+    if mirror_futures:
+        merged_data['image_urls'], merged_data['image_variants'] = collect_mirrored_images(
+            image_urls, mirror_futures, settings.IMAGE_MIRROR_TIMEOUT
+        )
+    _finish_job(job_id, ProductAnalysisJob.STATUS_DONE, result=merged_data)
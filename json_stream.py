@@ -0,0 +1,54 @@
+import json
+
+
+class JSONObjectStream:
+    """
+    تحليل كائن JSON يصل على أجزاء (مثل رد GPT المتدفق)، وإرجاع كل مفتاح
+    في المستوى الأول فور اكتمال قيمته دون انتظار نهاية الكائن.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = None  # الموضع بعد آخر حقل مكتمل
+        self._decoder = json.JSONDecoder()
+
+    @staticmethod
+    def _skip(buffer, pos, extra=""):
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in extra):
+            pos += 1
+        return pos
+
+    def feed(self, chunk):
+        """إضافة جزء جديد وإرجاع قائمة (المفتاح، القيمة) للحقول التي اكتملت."""
+        self._buffer += chunk
+        buffer = self._buffer
+        fields = []
+
+        if self._pos is None:
+            start = buffer.find("{")
+            if start == -1:
+                return fields
+            self._pos = start + 1
+
+        while True:
+            pos = self._skip(buffer, self._pos, ",")
+            if pos >= len(buffer) or buffer[pos] == "}":
+                break
+            try:
+                key, pos = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break
+            pos = self._skip(buffer, pos)
+            if pos >= len(buffer) or buffer[pos] != ":":
+                break
+            pos = self._skip(buffer, pos + 1)
+            try:
+                value, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break
+            # الأرقام في نهاية الجزء قد تكون غير مكتملة (مثل 12 من 125)
+            if end >= len(buffer) and not isinstance(value, (str, list, dict)):
+                break
+            fields.append((key, value))
+            self._pos = end
+        return fields
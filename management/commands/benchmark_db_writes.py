@@ -0,0 +1,180 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+
+from core.metrics import summarize
+from core.models import GPTCallRecord
+
+
+BENCHMARK_MODEL = "db-benchmark"
+
+
+def benchmark_profiles(directory):
+    """
+    الملفات التي تتم مقارنتها: الإعداد القديم (بدون WAL واتصال جديد لكل طلب)، وSQLite المحسّن،
+    وقاعدة البيانات الحالية (مثل Postgres عبر PgBouncer).
+    """
+    return {
+        "sqlite-default": {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'default.sqlite3'),
+            'CONN_MAX_AGE': 0,
+        },
+        "sqlite-wal": {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'wal.sqlite3'),
+            'CONN_MAX_AGE': settings.DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'PRAGMAS': settings.SQLITE_PRAGMAS,
+        },
+        "default": None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "مقارنة أداء الكتابة المتزامنة بين ملفات قاعدة البيانات (SQLite العادي، SQLite مع WAL، "
+        "والقاعدة الحالية): الإنتاجية والزمن وأخطاء القفل."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default=None,
+                            help="قائمة مفصولة بفواصل: sqlite-default,sqlite-wal,default")
+        parser.add_argument('--writers', type=int, default=8, help="عدد الخيوط التي تكتب في نفس الوقت")
+        parser.add_argument('--writes', type=int, default=200, help="عدد عمليات الكتابة لكل خيط")
+        parser.add_argument('--readers', type=int, default=2, help="عدد الخيوط التي تقرأ أثناء الكتابة")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            profiles = benchmark_profiles(directory)
+            names = options['profiles'].split(',') if options['profiles'] else [
+                "sqlite-default", "sqlite-wal",
+                *(["default"] if settings.DATABASE_PROFILE != 'sqlite' else []),
+            ]
+            unknown = set(names) - set(profiles)
+            if unknown:
+                raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+            for name in names:
+                alias = self._prepare(name, profiles[name])
+                try:
+                    result = self._run(alias, options['writers'], options['writes'], options['readers'])
+                finally:
+                    GPTCallRecord.objects.using(alias).filter(model=BENCHMARK_MODEL).delete()
+                    connections[alias].close()
+                self._print(name, result)
+
+    def _prepare(self, name, database):
+        if database is None:
+            return 'default'
+        alias = f"benchmark-{name}"
+        # configure_settings تضيف القيم الافتراضية (TIME_ZONE، OPTIONS، ...) وتشترط وجود default
+        configured = connections.configure_settings({'default': dict(settings.DATABASES['default']), alias: database})
+        connections.settings[alias] = configured[alias]
+        call_command('migrate', database=alias, run_syncdb=True, verbosity=0)
+        return alias
+
+    def _write(self, alias):
+        # إدراج ثم تحديث داخل معاملة واحدة، مثل تسجيل استدعاء ثم إنهاء مهمة
+        with transaction.atomic(using=alias):
+            record = GPTCallRecord.objects.using(alias).create(model=BENCHMARK_MODEL, mode='sync', prompt_tokens=100)
+            GPTCallRecord.objects.using(alias).filter(pk=record.pk).update(completion_tokens=50, latency_ms=1)
+
+    def _run(self, alias, writers, writes, readers):
+        # أزمنة المحاولات الناجحة فقط: الكتابة الفاشلة لا تُحسب في الإنتاجية
+        write_latencies = []
+        read_latencies = []
+        write_errors = []
+        read_errors = []
+        lock = threading.Lock()
+        writing = threading.Event()
+        writing.set()
+
+        def writer():
+            connection = connections[alias]
+            latencies = []
+            try:
+                for _ in range(writes):
+                    start = time.perf_counter()
+                    try:
+                        self._write(alias)
+                    except DatabaseError as e:
+                        with lock:
+                            write_errors.append(str(e))
+                    else:
+                        latencies.append(time.perf_counter() - start)
+                    # نهاية "الطلب": يُغلق الاتصال إذا كان CONN_MAX_AGE = 0
+                    connection.close_if_unusable_or_obsolete()
+            finally:
+                connection.close()
+                with lock:
+                    write_latencies.extend(latencies)
+
+        def reader():
+            connection = connections[alias]
+            latencies = []
+            try:
+                while writing.is_set():
+                    start = time.perf_counter()
+                    try:
+                        GPTCallRecord.objects.using(alias).filter(model=BENCHMARK_MODEL).count()
+                    except DatabaseError as e:
+                        with lock:
+                            read_errors.append(str(e))
+                    else:
+                        latencies.append(time.perf_counter() - start)
+                    connection.close_if_unusable_or_obsolete()
+            finally:
+                connection.close()
+                with lock:
+                    read_latencies.extend(latencies)
+
+        writer_threads = [threading.Thread(target=writer) for _ in range(writers)]
+        reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+        start = time.perf_counter()
+        for thread in writer_threads + reader_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        writing.clear()
+        for thread in reader_threads:
+            thread.join()
+
+        return {
+            "writes": len(write_latencies),
+            "write_errors": len(write_errors),
+            "write_locked": sum(1 for error in write_errors if "locked" in error),
+            "read_errors": len(read_errors),
+            "read_locked": sum(1 for error in read_errors if "locked" in error),
+            "errors": sorted(set(write_errors + read_errors))[:3],
+            "wall_seconds": round(wall, 3),
+            "writes_per_second": round(len(write_latencies) / wall, 1) if wall else 0.0,
+            "write_latency": summarize(write_latencies),
+            "reads": len(read_latencies),
+            "read_latency": summarize(read_latencies),
+        }
+
+    def _print(self, name, result):
+        write = result['write_latency']
+        read = result['read_latency']
+        self.stdout.write(self.style.MIGRATE_HEADING(f"[{name}]"))
+        self.stdout.write(
+            f"  writes={result['writes']} write_errors={result['write_errors']} (locked={result['write_locked']}) "
+            f"wall={result['wall_seconds']}s throughput={result['writes_per_second']}/s"
+        )
+        self.stdout.write(
+            f"  write latency p50={write['p50']}s p95={write['p95']}s p99={write['p99']}s max={write['max']}s"
+        )
+        self.stdout.write(
+            f"  reads={result['reads']} read_errors={result['read_errors']} (locked={result['read_locked']}) "
+            f"read latency p50={read['p50']}s p95={read['p95']}s"
+        )
+        for error in result['errors']:
+            self.stdout.write(self.style.ERROR(f"  error: {error}"))
@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.extractors import get_extractor
+from core.http_scraper import scrape_product_info_static
+from core.metrics import summarize
+
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'benchmarks', 'scrape_corpus',
+)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _normalize(value):
+    return "".join(str(value or "").split())
+
+
+def score_fields(data, expected, base_url):
+    """
+    مقارنة النتيجة بالقيم المتوقعة: ترجع {اسم الحقل: True/False}.
+    """
+    data = data or {}
+    expected_images = [url.replace("{base}", base_url) for url in expected.get("image_urls", [])]
+    return {
+        "title": _normalize(data.get("title")) == _normalize(expected.get("title")),
+        "price": _normalize(data.get("price")) == _normalize(expected.get("price")),
+        "image_urls": (data.get("image_urls") or [])[:len(expected_images)] == expected_images,
+        "reviews": len(data.get("reviews") or []) == expected.get("reviews", 0),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس أداء استخراج المنتجات على صفحات محفوظة يتم تقديمها من خادم محلي، "
+        "دون الحاجة إلى الإنترنت."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="مجلد الصفحات مع ملف manifest.json")
+        parser.add_argument('--path', choices=['http', 'selenium', 'both'], default='both')
+        parser.add_argument('--repeat', type=int, default=5, help="عدد مرات استخراج كل صفحة")
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--json', action='store_true', help="طباعة النتائج بصيغة JSON")
+
+    def handle(self, *args, **options):
+        manifest_path = os.path.join(options['corpus'], 'manifest.json')
+        if not os.path.exists(manifest_path):
+            raise CommandError(f"Corpus manifest not found: {manifest_path}")
+        with open(manifest_path, encoding='utf-8') as handle:
+            manifest = json.load(handle)
+
+        server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), partial(QuietHandler, directory=options['corpus'])
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        paths = ['http', 'selenium'] if options['path'] == 'both' else [options['path']]
+        try:
+            report = {
+                path: self._run(path, manifest, base_url, options['repeat'], options['concurrency'])
+                for path in paths
+            }
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+        else:
+            for path, result in report.items():
+                self._print(path, result)
+
+    def _scrape(self, path, url, extractor):
+        if path == 'http':
+            # الاستيراد هنا لأن views تحمل Selenium عند استيرادها
+            from core.views import USER_AGENTS
+            return scrape_product_info_static(url, USER_AGENTS, extractor=extractor)
+        from core.views import scrape_product_info_selenium
+        return scrape_product_info_selenium(url, extractor=extractor)
+
+    def _run_one(self, path, page, base_url):
+        url = f"{base_url}/{page['file']}"
+        extractor = get_extractor(url, page.get('extractor'))
+        start = time.perf_counter()
+        try:
+            data = self._scrape(path, url, extractor)
+        except Exception as e:
+            data = {'error': str(e)}
+        elapsed = time.perf_counter() - start
+        error = (data or {}).get('error') or ("no data" if not data else None)
+        if error:
+            data = None
+        return page['file'], elapsed, data, score_fields(data, page['expected'], base_url), error
+
+    def _run(self, path, manifest, base_url, repeat, concurrency):
+        tasks = [page for page in manifest for _ in range(repeat)]
+
+        # تمريرة تمهيدية غير محسوبة (تشغيل المتصفح، فتح الاتصالات)
+        self._run_one(path, manifest[0], base_url)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda page: self._run_one(path, page, base_url), tasks))
+        wall = time.perf_counter() - start
+
+        latencies = [elapsed for _, elapsed, _, _, _ in results]
+        errors = sorted({error for *_, error in results if error})
+        bytes_transferred = [
+            data.get('bytes_transferred') or 0 for _, _, data, _, _ in results if data is not None
+        ]
+
+        accuracy = {}
+        pages = {}
+        for name, _, _, scores, _ in results:
+            for field, ok in scores.items():
+                accuracy.setdefault(field, []).append(ok)
+            page = pages.setdefault(name, {"runs": 0, "correct_fields": 0, "fields": len(scores)})
+            page["runs"] += 1
+            page["correct_fields"] += sum(scores.values())
+
+        return {
+            "requests": len(results),
+            "failures": sum(1 for *_, error in results if error),
+            "errors": errors[:5],
+            "wall_seconds": round(wall, 3),
+            "throughput_per_second": round(len(results) / wall, 2) if wall else 0.0,
+            "latency": summarize(latencies),
+            "mean_bytes": round(sum(bytes_transferred) / len(bytes_transferred)) if bytes_transferred else 0,
+            "accuracy": {
+                field: round(sum(values) / len(values), 3) for field, values in accuracy.items()
+            },
+            "pages": {
+                name: round(page["correct_fields"] / (page["runs"] * page["fields"]), 3)
+                for name, page in pages.items()
+            },
+        }
+
+    def _print(self, path, result):
+        latency = result['latency']
+        self.stdout.write(self.style.MIGRATE_HEADING(f"[{path}]"))
+        self.stdout.write(
+            f"  requests={result['requests']} failures={result['failures']} "
+            f"wall={result['wall_seconds']}s throughput={result['throughput_per_second']}/s"
+        )
+        self.stdout.write(
+            f"  latency p50={latency['p50']}s p90={latency['p90']}s "
+            f"p95={latency['p95']}s p99={latency['p99']}s max={latency['max']}s"
+        )
+        self.stdout.write(f"  mean bytes={result['mean_bytes']}")
+        for error in result['errors']:
+            self.stdout.write(self.style.ERROR(f"  error: {error}"))
+        self.stdout.write(
+            "  accuracy " + " ".join(f"{field}={value}" for field, value in result['accuracy'].items())
+        )
+        for name, value in result['pages'].items():
+            style = self.style.SUCCESS if value == 1 else self.style.WARNING
+            self.stdout.write(style(f"    {name}: {value}"))
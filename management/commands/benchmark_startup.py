@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.metrics import summarize
+
+
+STARTUP_SCRIPT = "import django; django.setup(); import {module}"
+
+
+def parse_importtime(output):
+    """
+    قراءة مخرجات python -X importtime: ترجع [(الوحدة، الزمن التراكمي بالثواني)]
+    للوحدات المستوردة مباشرة (وليس الوحدات الداخلية التابعة لها).
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if name.startswith("  "):
+            continue
+        modules.append((name.strip(), int(cumulative) / 1_000_000))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس زمن إقلاع العامل: تحميل Django واستيراد views في عملية جديدة، "
+        "مع أبطأ الوحدات. يفشل إذا تجاوز الوسيط --max-seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--module', default='core.views', help="الوحدة التي يتم استيرادها بعد django.setup()")
+        parser.add_argument('--top', type=int, default=15, help="عدد أبطأ الوحدات المعروضة")
+        parser.add_argument('--max-seconds', type=float, default=None, help="الحد المسموح لوسيط زمن الإقلاع")
+
+    def handle(self, *args, **options):
+        command = [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT.format(module=options['module'])]
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "")}
+
+        timings = []
+        modules = []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+            timings.append(time.perf_counter() - start)
+            if result.returncode != 0:
+                raise CommandError(f"Import failed:\n{result.stderr[-2000:]}")
+            modules = parse_importtime(result.stderr)
+
+        summary = summarize(timings)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"[startup] import {options['module']}"))
+        self.stdout.write(
+            f"  runs={summary['count']} mean={summary['mean']}s p50={summary['p50']}s max={summary['max']}s"
+        )
+        self.stdout.write("  slowest imports (last run):")
+        for name, seconds in sorted(modules, key=lambda item: item[1], reverse=True)[:options['top']]:
+            self.stdout.write(f"    {seconds:8.3f}s  {name}")
+
+        if options['max_seconds'] is not None and summary['p50'] > options['max_seconds']:
+            raise CommandError(
+                f"Startup p50 {summary['p50']}s exceeds the {options['max_seconds']}s budget"
+            )
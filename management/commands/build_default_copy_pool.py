@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.default_copy import COPY_KEYS, is_valid_variant, pool_path, write_default_copy_pool
+
+
+SAMPLE_PRODUCTS = [
+    {"title": "Wireless Earbuds with Charging Case", "price": "49.99",
+     "description": "Bluetooth 5.3 earbuds with noise reduction and 30-hour battery life."},
+    {"title": "Insulated Stainless Steel Water Bottle", "price": "24.95",
+     "description": "Double-wall vacuum bottle, keeps drinks cold for 24 hours and hot for 12."},
+    {"title": "LED Desk Lamp with Wireless Charger", "price": "39.00",
+     "description": "Dimmable eye-care desk lamp with a built-in Qi wireless charging pad."},
+    {"title": "Non-Slip Yoga Mat", "price": "29.99",
+     "description": "6mm thick cushioned yoga mat with a non-slip texture and carrying strap."},
+    {"title": "Fitness Smart Watch", "price": "79.99",
+     "description": "Heart rate, sleep and workout tracking with a seven-day battery."},
+    {"title": "Electric Burr Coffee Grinder", "price": "59.00",
+     "description": "Conical burr grinder with 18 grind settings from espresso to French press."},
+    {"title": "Portable Blender", "price": "34.99",
+     "description": "USB-C rechargeable personal blender for smoothies and shakes on the go."},
+    {"title": "Memory Foam Pillow", "price": "44.00",
+     "description": "Ergonomic contour pillow that supports the neck for side and back sleepers."},
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "توليد مجموعة النصوص الافتراضية لصفحة المعاينة مسبقًا باستخدام GPT، "
+        "حتى لا تحتاج الصفحة لأي استدعاء عند عرضها."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variants', type=int, default=len(SAMPLE_PRODUCTS), help="عدد النسخ المطلوبة")
+        parser.add_argument('--output', default=None, help="مسار الملف (الافتراضي DEFAULT_COPY_POOL_PATH)")
+
+    def handle(self, *args, **options):
+        # الاستيراد هنا لأن views تحمل Selenium وعميل OpenAI عند استيرادها
+        from core.views import analyze_product_with_gpt
+
+        variants = []
+        for index in range(options['variants']):
+            product = SAMPLE_PRODUCTS[index % len(SAMPLE_PRODUCTS)]
+            # تكرار نفس المنتج يحتاج ردًا جديدًا وليس الرد المخزن
+            gpt_data = analyze_product_with_gpt(product, force_refresh=index >= len(SAMPLE_PRODUCTS))
+            if "error" in gpt_data or gpt_data.get("fallback"):
+                self.stdout.write(self.style.WARNING(
+                    f"  skipped {product['title']}: {gpt_data.get('error', 'fallback copy')}"
+                ))
+                continue
+
+            variant = {**product, **gpt_data}
+            variant = {key: variant.get(key) for key in COPY_KEYS}
+            if not is_valid_variant(variant):
+                self.stdout.write(self.style.WARNING(f"  skipped {product['title']}: incomplete copy"))
+                continue
+            variants.append(variant)
+            self.stdout.write(f"  {product['title']}: {variant['headline']}")
+
+        if not variants:
+            raise CommandError("No variants were generated, the existing pool was kept")
+
+        output = options['output'] or pool_path()
+        write_default_copy_pool(variants, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(variants)} variants to {output}"))
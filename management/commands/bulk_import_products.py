@@ -0,0 +1,43 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bulk_import import iter_bulk_import, parse_url_list
+
+
+class Command(BaseCommand):
+    help = "استيراد قائمة روابط منتجات من ملف CSV أو نصي وإنشاء صفحات هبوط غير منشورة."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="ملف CSV (بعمود url) أو ملف نصي برابط في كل سطر")
+        parser.add_argument('--user', required=True, help="اسم المستخدم المالك للصفحات")
+        parser.add_argument('--concurrency', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        with open(options['path'], 'rb') as handle:
+            if options['path'].lower().endswith('.csv'):
+                urls = parse_url_list(csv_file=handle)
+            else:
+                urls = parse_url_list(handle.read().decode('utf-8-sig'))
+
+        if not urls:
+            raise CommandError("No valid URLs found")
+        self.stdout.write(f"Importing {len(urls)} product(s)...")
+
+        for event in iter_bulk_import(
+            user, urls,
+            concurrency=options['concurrency'],
+            batch_size=options['batch_size'],
+        ):
+            line = json.dumps(event, ensure_ascii=False)
+            if event['event'] == 'failed':
+                self.stderr.write(line)
+            else:
+                self.stdout.write(line)
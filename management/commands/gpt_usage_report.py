@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from core.gpt_cache import gpt_cache_stats
+from core.gpt_usage import usage_by_day, usage_by_user
+
+
+class Command(BaseCommand):
+    help = "عرض استهلاك GPT (التوكنات، الزمن، التكلفة) لكل يوم ولكل مستخدم."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7)
+
+    def handle(self, *args, **options):
+        columns = (
+            "calls", "failures", "truncated_calls", "total_prompt_tokens",
+            "total_completion_tokens", "max_completion_tokens", "avg_latency_ms", "total_retries", "total_cost",
+        )
+        header = " ".join(f"{column.replace('total_', ''):>12.12}" for column in columns)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("By day"))
+        self.stdout.write(f"{'day':<12} {header}")
+        for row in usage_by_day(options['days']):
+            self.stdout.write(f"{str(row['day']):<12} {self._row(row, columns)}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("By user"))
+        self.stdout.write(f"{'user':<12} {header}")
+        for row in usage_by_user(options['days']):
+            self.stdout.write(f"{str(row['user__username'] or '-'):<12.12} {self._row(row, columns)}")
+
+        # الإصابات في ذاكرة الردود لا تُسجل كاستدعاءات
+        stats = gpt_cache_stats()
+        self.stdout.write(self.style.MIGRATE_HEADING("Response cache"))
+        self.stdout.write(f"hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']}")
+
+    @staticmethod
+    def _row(row, columns):
+        values = []
+        for column in columns:
+            value = row[column]
+            if value is None:
+                value = 0
+            if isinstance(value, float):
+                value = round(value)
+            elif isinstance(value, Decimal):
+                value = value.quantize(Decimal('0.0001'))
+            values.append(f"{str(value):>12}")
+        return " ".join(values)
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from functools import partial
+from http.server import ThreadingHTTPServer
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core import metrics
+from core.extractors import get_extractor
+from core.http_scraper import scrape_product_info_static
+from core.management.commands.benchmark_scraper import DEFAULT_CORPUS, QuietHandler
+from core.management.commands.mock_openai_server import add_mock_arguments, mock_options_from
+from core.metrics import summarize
+from core.mock_openai import start_mock_openai_server
+from core.models import ProductAnalysisJob
+from core.scrape_cache import store_scrape
+
+
+class Command(BaseCommand):
+    help = (
+        "اختبار حمل لمسارات تحليل المنتجات (fetch_product_details ومهام product_selection) "
+        "على صفحات محلية وخادم OpenAI وهمي، دون استهلاك الرصيد. "
+        "نتائج الاستخراج تُخزن مسبقًا حتى يقيس الاختبار التحليل فقط (الاستخراج له benchmark_scraper)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=['fetch', 'jobs'], default='fetch')
+        parser.add_argument('--requests', type=int, default=100, help="عدد الطلبات الكلي")
+        parser.add_argument('--concurrency', type=int, default=10, help="عدد الطلبات المتزامنة (fetch)")
+        parser.add_argument('--rate', type=float, default=0.0,
+                            help="عدد المهام المرسلة في الثانية (jobs)، 0 = دفعة واحدة")
+        parser.add_argument('--timeout', type=float, default=600.0, help="أقصى مدة لانتظار انتهاء المهام")
+        parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="مجلد الصفحات مع ملف manifest.json")
+        parser.add_argument('--no-mock', action='store_true',
+                            help="استخدام OPENAI_BASE_URL الحالي بدل تشغيل الخادم الوهمي")
+        parser.add_argument('--use-gpt-cache', action='store_true',
+                            help="السماح بردود GPT المخزنة (معطلة افتراضيًا حتى يصل كل طلب إلى الخادم)")
+        parser.add_argument('--json', action='store_true', help="طباعة النتائج بصيغة JSON")
+        add_mock_arguments(parser)
+
+    def handle(self, *args, **options):
+        manifest_path = os.path.join(options['corpus'], 'manifest.json')
+        if not os.path.exists(manifest_path):
+            raise CommandError(f"Corpus manifest not found: {manifest_path}")
+        with open(manifest_path, encoding='utf-8') as handle:
+            manifest = json.load(handle)
+
+        page_server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=options['corpus']))
+        threading.Thread(target=page_server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{page_server.server_address[1]}"
+        urls = [f"{base_url}/{page['file']}" for page in manifest]
+
+        mock_server = None
+        if not options['no_mock']:
+            mock_server = start_mock_openai_server(options=mock_options_from(options))
+            # يجب ضبط العنوان قبل استيراد views حتى ينشأ عميل OpenAI عليه
+            settings.OPENAI_BASE_URL = mock_server.base_url
+        if not options['use_gpt_cache']:
+            settings.GPT_CACHE_ENABLED = False
+        # سطر لكل طلب في السجل يبطئ الاختبار نفسه
+        logging.getLogger('core.metrics').setLevel(logging.WARNING)
+
+        try:
+            self._prime_scrape_cache(manifest, base_url)
+            if options['target'] == 'fetch':
+                report = asyncio.run(self._run_fetch(urls, options['requests'], options['concurrency']))
+            else:
+                report = self._run_jobs(urls, options['requests'], options['rate'], options['timeout'])
+        finally:
+            page_server.shutdown()
+            page_server.server_close()
+            if mock_server is not None:
+                mock_server.shutdown()
+                mock_server.server_close()
+
+        report["events"] = {name: entry["all"] for name, entry in metrics.snapshot()["events"].items()}
+        report["phases"] = {
+            phase: entry["all"] for phase, entry in metrics.snapshot()["phases"].items()
+            if entry["all"] and phase.startswith(("gpt", "scrape"))
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+        else:
+            self._print(options['target'], report)
+
+    def _prime_scrape_cache(self, manifest, base_url):
+        # الاستيراد هنا لأن views تحمل Selenium وعميل OpenAI عند استيرادها
+        from core.views import USER_AGENTS
+
+        for page in manifest:
+            url = f"{base_url}/{page['file']}"
+            product_info = scrape_product_info_static(url, USER_AGENTS, extractor=get_extractor(url, page.get('extractor')))
+            if product_info is None:
+                raise CommandError(f"Could not extract corpus page {page['file']}")
+            store_scrape(url, product_info)
+
+    # ============================
+    # fetch_product_details: عدد ثابت من الطلبات المتزامنة
+    # ============================
+
+    async def _run_fetch(self, urls, total, concurrency):
+        from django.test import AsyncClient
+        from django.urls import reverse
+
+        endpoint = reverse('fetch_product_details')
+        # عميل الاختبار يرسل Host: testserver، كما يفعل مشغل اختبارات Django
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        in_flight = 0
+        peak_in_flight = 0
+
+        async def one(index):
+            nonlocal in_flight, peak_in_flight
+            async with semaphore:
+                in_flight += 1
+                peak_in_flight = max(peak_in_flight, in_flight)
+                start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        endpoint, json.dumps({"url": urls[index % len(urls)]}), content_type="application/json"
+                    )
+                    data = json.loads(response.content)
+                    if not data.get("success"):
+                        outcome = "error"
+                        error = data.get("error")
+                    else:
+                        outcome = "fallback" if data["data"].get("fallback") else "ok"
+                        error = None
+                except Exception as e:
+                    outcome, error = "error", str(e)
+                finally:
+                    in_flight -= 1
+                return time.perf_counter() - start, outcome, error
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(index) for index in range(total)))
+        wall = time.perf_counter() - start
+
+        latencies = [elapsed for elapsed, _, _ in results]
+        report = self._summary(results, wall)
+        report["saturation"] = {
+            "concurrency": concurrency,
+            "peak_in_flight": peak_in_flight,
+            "mean_in_flight": round(sum(latencies) / wall, 2) if wall else 0.0,
+        }
+        return report
+
+    # ============================
+    # مهام product_selection: إرسال المهام ثم قياس الانتظار والتنفيذ من سجلاتها
+    # ============================
+
+    def _run_jobs(self, urls, total, rate, timeout):
+        from core.jobs import create_product_job
+
+        user, _ = User.objects.get_or_create(username="loadtest")
+        job_ids = []
+        start = time.perf_counter()
+        for index in range(total):
+            job_ids.append(create_product_job(user, urls[index % len(urls)]).pk)
+            if rate:
+                time.sleep(max(0.0, start + (index + 1) / rate - time.perf_counter()))
+
+        deadline = time.monotonic() + timeout
+        finished = (ProductAnalysisJob.STATUS_DONE, ProductAnalysisJob.STATUS_FAILED)
+        while ProductAnalysisJob.objects.filter(pk__in=job_ids).exclude(status__in=finished).exists():
+            if time.monotonic() > deadline:
+                raise CommandError(f"Jobs did not finish within {timeout}s")
+            time.sleep(0.2)
+        wall = time.perf_counter() - start
+
+        jobs = list(ProductAnalysisJob.objects.filter(pk__in=job_ids))
+        results = []
+        waits = []
+        intervals = []
+        for job in jobs:
+            if job.status == ProductAnalysisJob.STATUS_FAILED:
+                outcome = "error"
+            else:
+                outcome = "fallback" if job.result.get("fallback") else "ok"
+            started_at = job.started_at or job.finished_at
+            results.append(((job.finished_at - job.created_at).total_seconds(), outcome, job.error or None))
+            waits.append((started_at - job.created_at).total_seconds())
+            intervals.append((started_at, job.finished_at))
+
+        # أقصى عدد مهام كانت تعمل في نفس اللحظة، من فترات التنفيذ المسجلة
+        running = peak_running = 0
+        for _, change in sorted([(started, 1) for started, _ in intervals] + [(ended, -1) for _, ended in intervals]):
+            running += change
+            peak_running = max(peak_running, running)
+        busy_seconds = sum((ended - started).total_seconds() for started, ended in intervals)
+        mean_busy = busy_seconds / wall if wall else 0.0
+
+        report = self._summary(results, wall)
+        report["saturation"] = {
+            "workers": settings.PRODUCT_JOB_WORKERS,
+            "peak_running": peak_running,
+            "mean_busy_workers": round(mean_busy, 2),
+            "utilization": round(mean_busy / settings.PRODUCT_JOB_WORKERS, 3),
+            "queue_wait": summarize(waits),
+        }
+        return report
+
+    # ============================
+
+    @staticmethod
+    def _summary(results, wall):
+        outcomes = {}
+        for _, outcome, _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        return {
+            "requests": len(results),
+            "outcomes": outcomes,
+            "errors": sorted({error for *_, error in results if error})[:5],
+            "wall_seconds": round(wall, 3),
+            "throughput_per_second": round(len(results) / wall, 2) if wall else 0.0,
+            "latency": summarize([elapsed for elapsed, _, _ in results]),
+        }
+
+    def _print(self, target, report):
+        latency = report['latency']
+        self.stdout.write(self.style.MIGRATE_HEADING(f"[{target}]"))
+        self.stdout.write(
+            f"  requests={report['requests']} "
+            + " ".join(f"{outcome}={count}" for outcome, count in sorted(report['outcomes'].items()))
+        )
+        self.stdout.write(
+            f"  wall={report['wall_seconds']}s throughput={report['throughput_per_second']}/s"
+        )
+        self.stdout.write(
+            f"  latency p50={latency['p50']}s p95={latency['p95']}s p99={latency['p99']}s max={latency['max']}s"
+        )
+        saturation = dict(report['saturation'])
+        queue_wait = saturation.pop('queue_wait', None)
+        self.stdout.write("  saturation " + " ".join(f"{key}={value}" for key, value in saturation.items()))
+        if queue_wait:
+            self.stdout.write(
+                f"  queue wait p50={queue_wait['p50']}s p95={queue_wait['p95']}s max={queue_wait['max']}s"
+            )
+        for error in report['errors']:
+            self.stdout.write(self.style.ERROR(f"  error: {error}"))
+        if report['events']:
+            self.stdout.write("  events " + " ".join(f"{name}={count}" for name, count in report['events'].items()))
+        for phase, summary in report['phases'].items():
+            self.stdout.write(f"    {phase}: p50={summary['p50']}s p95={summary['p95']}s n={summary['count']}")
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mock_openai import MockOpenAIOptions, start_mock_openai_server
+
+
+def add_mock_arguments(parser):
+    """خيارات سلوك الخادم الوهمي، مشتركة مع أمر loadtest_analysis."""
+    parser.add_argument('--latency-median', type=float, default=1.0, help="وسيط زمن الاستجابة بالثواني")
+    parser.add_argument('--latency-p99', type=float, default=4.0, help="زمن الاستجابة p99 بالثواني")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="نسبة الطلبات التي ترجع خطأ HTTP")
+    parser.add_argument('--error-statuses', default="429,500,503", help="رموز الأخطاء المستخدمة")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="نسبة الردود بصيغة JSON مقطوعة")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="نسبة الطلبات التي لا ترد (لاختبار المهلة)")
+    parser.add_argument('--hang-seconds', type=float, default=120.0)
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def mock_options_from(options):
+    return MockOpenAIOptions(
+        latency_median=options['latency_median'],
+        latency_p99=options['latency_p99'],
+        error_rate=options['error_rate'],
+        error_statuses=[int(status) for status in options['error_statuses'].split(',') if status.strip()],
+        malformed_rate=options['malformed_rate'],
+        hang_rate=options['hang_rate'],
+        hang_seconds=options['hang_seconds'],
+        seed=options['seed'],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "تشغيل خادم محلي متوافق مع chat completions بدل OpenAI لاختبار الحمل دون استهلاك الرصيد. "
+        "شغّل التطبيق مع OPENAI_BASE_URL=http://127.0.0.1:<port>/v1"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        add_mock_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = start_mock_openai_server(options['host'], options['port'], mock_options_from(options))
+        self.stdout.write(self.style.SUCCESS(f"Mock OpenAI server listening on {server.base_url}"))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            server.server_close()
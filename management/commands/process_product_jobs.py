@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import requeue_stale_jobs, run_product_job
+from core.models import ProductAnalysisJob
+from core.views import get_driver_pool
+
+
+class Command(BaseCommand):
+    help = "تنفيذ مهام تحليل المنتجات المعلقة خارج عملية الويب."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="الاستمرار في انتظار مهام جديدة")
+        parser.add_argument('--interval', type=float, default=2.0, help="ثوانٍ بين كل فحص للمهام")
+
+    def handle(self, *args, **options):
+        if settings.SCRAPER_DRIVER_PREWARM:
+            # تشغيل المتصفحات في الخلفية أثناء البحث عن أول مهمة
+            get_driver_pool()
+
+        while True:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+            pending = list(
+                ProductAnalysisJob.objects
+                .filter(status=ProductAnalysisJob.STATUS_PENDING)
+                .order_by('created_at')
+                .values_list('pk', flat=True)[:50]
+            )
+            for job_id in pending:
+                run_product_job(job_id)
+                self.stdout.write(f"Processed job {job_id}")
+
+            if not options['loop']:
+                break
+            if not pending:
+                time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.chromedriver import ChromeDriverNotFound, install_chromedriver, resolve_chromedriver
+
+
+class Command(BaseCommand):
+    help = (
+        "تحديد مسار ChromeDriver مرة واحدة (تنزيله إن لزم) وحفظه في CHROMEDRIVER_MANIFEST، "
+        "حتى تعمل عمليات الاستخراج دون أي طلب شبكة لتحديد النسخة."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="إعادة التنزيل حتى لو كان هناك مسار محفوظ")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            if options['force'] and not settings.CHROMEDRIVER_PATH:
+                path, source = install_chromedriver(), "install"
+            else:
+                try:
+                    path, source = resolve_chromedriver()
+                except ChromeDriverNotFound:
+                    if settings.CHROMEDRIVER_PATH:
+                        raise
+                    # هذا الأمر هو خطوة التثبيت الصريحة، لذلك يعمل حتى مع CHROMEDRIVER_AUTO_INSTALL=False
+                    path, source = install_chromedriver(), "install"
+        except ChromeDriverNotFound as e:
+            raise CommandError(str(e))
+        except Exception as e:
+            raise CommandError(f"ChromeDriver installation failed: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"ChromeDriver from {source} in {time.perf_counter() - start:.3f}s: {path}"
+        ))
+        if source == "install":
+            self.stdout.write(f"Saved to {settings.CHROMEDRIVER_MANIFEST}")
@@ -0,0 +1,182 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+
+
+logger = logging.getLogger(__name__)
+
+ALL_DOMAINS = "*"
+
+_lock = threading.Lock()
+_samples = {}
+_counters = defaultdict(int)
+_current_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+# ============================
+# تسجيل الأزمنة
+# ============================
+
+def domain_of(url):
+    """اسم النطاق المستخدم لتجميع القياسات (بدون www)."""
+    host = urlparse(url).netloc.lower().split(':')[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def record(phase, seconds, domain=None):
+    """
+    تسجيل مدة مرحلة واحدة، على مستوى جميع النطاقات وعلى مستوى النطاق المحدد.
+    """
+    keys = [(phase, ALL_DOMAINS)]
+    if domain:
+        keys.append((phase, domain))
+    with _lock:
+        for key in keys:
+            samples = _samples.get(key)
+            if samples is None:
+                # نحتفظ بآخر N قياس فقط لكل مرحلة حتى تبقى الذاكرة محدودة
+                samples = _samples[key] = deque(maxlen=settings.METRICS_SAMPLE_SIZE)
+            samples.append(seconds)
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace["spans"].append((phase, seconds))
+
+
+def increment(name, domain=None):
+    """زيادة عداد حدث (مثل إعادة المحاولة أو الإصابة في الذاكرة المؤقتة)."""
+    with _lock:
+        _counters[(name, ALL_DOMAINS)] += 1
+        if domain:
+            _counters[(name, domain)] += 1
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace["events"][name] += 1
+
+
+@contextmanager
+def span(phase, domain=None):
+    """قياس مدة الكود داخل الكتلة وتسجيلها كمرحلة."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start, domain)
+
+
+@contextmanager
+def trace(name, domain=None, **fields):
+    """
+    تجميع مراحل عملية واحدة (مثل استخراج منتج) وكتابتها في سطر سجل واحد عند الانتهاء.
+
+    يمكن إضافة حقول للسطر أثناء التنفيذ عبر القاموس المُرجَع: trace_fields["source"] = "http".
+    """
+    current = {"spans": [], "events": defaultdict(int), "fields": dict(fields)}
+    token = _current_trace.set(current)
+    start = time.perf_counter()
+    try:
+        yield current["fields"]
+    finally:
+        total = time.perf_counter() - start
+        _current_trace.reset(token)
+        record(f"{name}.total", total, domain)
+
+        parts = [f"{name}", f"domain={domain or '-'}"]
+        parts += [f"{key}={value}" for key, value in current["fields"].items()]
+        parts.append(f"total={total:.3f}s")
+        parts += [f"{phase}={seconds:.3f}s" for phase, seconds in current["spans"]]
+        parts += [f"{event}={count}" for event, count in current["events"].items()]
+        logger.info(" ".join(parts))
+
+
+def increment_shared(cache, key, amount=1, timeout=None):
+    """
+    زيادة عداد في ذاكرة مؤقتة مشتركة بين العمليات، وإرجاع قيمته الجديدة.
+
+    incr أولًا لأن العداد موجود غالبًا؛ وإذا لم يوجد فإن add لا تكتب فوق عداد أنشأته عملية
+    أخرى في نفس اللحظة. incr ذرية في Redis/Memcached فقط، وفي FileBasedCache العداد تقريبي.
+    timeout تُطبق عند إنشاء العداد، ولا تتغير مدة العداد الموجود.
+    """
+    try:
+        value = cache.incr(key, amount)
+    except ValueError:
+        if cache.add(key, amount, timeout=timeout):
+            return amount
+        value = cache.incr(key, amount)
+    if type(cache).incr is BaseCache.incr:
+        # BaseCache.incr (FileBasedCache وقاعدة البيانات) تقرأ ثم تكتب بالمدة الافتراضية (300 ثانية)
+        # فتضيع مدة العداد: نعيد كتابته بالمدة المطلوبة
+        cache.set(key, value, timeout=timeout)
+    return value
+
+
+# ============================
+# التجميع
+# ============================
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def phase_percentile(phase, percent, domain=None):
+    """
+    النسبة المئوية لمدة مرحلة في هذه العملية، أو None إذا كانت القياسات أقل من
+    METRICS_MIN_SAMPLES.
+    """
+    with _lock:
+        values = list(_samples.get((phase, domain or ALL_DOMAINS), ()))
+    if len(values) < settings.METRICS_MIN_SAMPLES:
+        return None
+    return _percentile(sorted(values), percent)
+
+
+def summarize(values):
+    """ملخص قائمة أزمنة: العدد والمتوسط والنسب المئوية."""
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4) if ordered else 0.0,
+        "p50": round(_percentile(ordered, 50), 4),
+        "p90": round(_percentile(ordered, 90), 4),
+        "p95": round(_percentile(ordered, 95), 4),
+        "p99": round(_percentile(ordered, 99), 4),
+        "max": round(ordered[-1], 4) if ordered else 0.0,
+    }
+
+
+def snapshot():
+    """
+    ملخص جميع المراحل (بالثواني) والعدادات لهذه العملية فقط.
+    """
+    with _lock:
+        samples = {key: list(values) for key, values in _samples.items()}
+        counters = dict(_counters)
+
+    phases = {}
+    for (phase, domain), values in sorted(samples.items()):
+        entry = phases.setdefault(phase, {"all": None, "domains": {}})
+        if domain == ALL_DOMAINS:
+            entry["all"] = summarize(values)
+        else:
+            entry["domains"][domain] = summarize(values)
+
+    events = {}
+    for (name, domain), count in sorted(counters.items()):
+        entry = events.setdefault(name, {"all": 0, "domains": {}})
+        if domain == ALL_DOMAINS:
+            entry["all"] = count
+        else:
+            entry["domains"][domain] = count
+
+    return {"phases": phases, "events": events}
@@ -0,0 +1,188 @@
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+COPY_FIELDS = {
+    "headline": "Mock Headline For Load Testing",
+    "subheadline": "A predictable subheadline returned by the local mock server",
+    "usp": "Zero API quota used",
+    "benefits": ["Fast", "Free", "Repeatable"],
+    "cta": "Buy Now",
+    "testimonial": "Works exactly like the real thing, minus the bill.",
+    "urgency": "Only while the load test runs",
+}
+
+BATCH_PRODUCT_PATTERN = re.compile(r"^\s*\[(\d+)\]\s*$", re.MULTILINE)
+
+
+class MockOpenAIOptions:
+    """
+    سلوك الخادم الوهمي: توزيع زمن الاستجابة ونسب الأخطاء وJSON التالف.
+
+    الزمن يتبع توزيعًا لوغاريتميًا طبيعيًا محددًا بالوسيط وقيمة p99، مثل زمن OpenAI الحقيقي.
+    """
+
+    def __init__(self, latency_median=1.0, latency_p99=4.0, error_rate=0.0, error_statuses=(429, 500, 503),
+                 malformed_rate=0.0, hang_rate=0.0, hang_seconds=120.0, seed=None):
+        self.latency_median = latency_median
+        self.latency_p99 = max(latency_p99, latency_median)
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.malformed_rate = malformed_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self):
+        """ترجع (الزمن، رمز الخطأ أو None، هل الرد تالف، هل يتوقف الطلب)."""
+        with self.lock:
+            if self.latency_median > 0:
+                # 2.326 هو z لقيمة p99 في التوزيع الطبيعي
+                sigma = math.log(self.latency_p99 / self.latency_median) / 2.326
+                latency = self.random.lognormvariate(math.log(self.latency_median), sigma)
+            else:
+                latency = 0.0
+            status = self.random.choice(self.error_statuses) if self.random.random() < self.error_rate else None
+            malformed = self.random.random() < self.malformed_rate
+            hang = self.random.random() < self.hang_rate
+        return latency, status, malformed, hang
+
+
+def mock_content(messages):
+    """
+    محتوى الرد حسب الطلب: نص صفحة واحدة، أو كائن مرقم لكل منتج في طلب الدفعة.
+    """
+    prompt = "\n".join(str(message.get("content", "")) for message in messages if message.get("role") == "user")
+    numbers = BATCH_PRODUCT_PATTERN.findall(prompt)
+    if numbers:
+        return json.dumps({number: COPY_FIELDS for number in numbers})
+    return json.dumps(COPY_FIELDS)
+
+
+def _usage(messages, content):
+    prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        options = self.server.mock_options
+        latency, status, malformed, hang = options.sample()
+        if hang:
+            time.sleep(options.hang_seconds)
+        if status:
+            time.sleep(latency / 4)
+            self._send_json(status, {"error": {"message": f"Mock error {status}", "type": "server_error"}})
+            return
+
+        messages = request.get("messages") or []
+        content = mock_content(messages)
+        if malformed:
+            # قطع الرد في منتصفه كما يحدث عند الوصول إلى max_tokens
+            content = content[:len(content) // 2]
+
+        if request.get("stream"):
+            self._stream(request, content, latency)
+        else:
+            time.sleep(latency)
+            self._send_json(200, {
+                "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "length" if malformed else "stop",
+                }],
+                "usage": _usage(messages, content),
+            })
+
+    def _stream(self, request, content, latency):
+        """إرسال الرد كقطع SSE موزعة على زمن الاستجابة، بعد تأخير أول قطعة."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        pieces = [content[index:index + 16] for index in range(0, len(content), 16)] or [""]
+        time.sleep(latency * 0.3)
+
+        def send(choices, usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": choices,
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            for piece in pieces:
+                time.sleep(latency * 0.7 / len(pieces))
+                send([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+            send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if (request.get("stream_options") or {}).get("include_usage"):
+                send([], usage=_usage(request.get("messages") or [], content))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_mock_openai_server(host="127.0.0.1", port=0, options=None):
+    """
+    تشغيل الخادم في خيط منفصل. ترجع الخادم؛ عنوانه في server.base_url.
+    """
+    server = ThreadingHTTPServer((host, port), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.mock_options = options or MockOpenAIOptions()
+    server.base_url = f"http://{host}:{server.server_address[1]}/v1"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,9 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
 from autoslug import AutoSlugField
+from django.utils import timezone
 from django.utils.text import slugify
 import random
 import string
+import uuid
 
 
 
@@ -20,6 +22,7 @@ class LandingPage(models.Model):
     hero_image = models.ImageField(upload_to="hero_images/", blank=True, null=True, verbose_name="main pic ")
     slug = models.SlugField(unique=True, verbose_name="الرابط الفريد")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     usp = models.CharField(max_length=255, verbose_name="نقطة البيع الفريدة")
@@ -27,6 +30,8 @@ class LandingPage(models.Model):
     cta = models.CharField(max_length=255, verbose_name="دعوة للعمل")
     testimonials = models.JSONField(default=list, verbose_name="تقييمات العملاء")
     urgency = models.CharField(max_length=255, verbose_name="عنصر الاستعجال")
+    image_urls = models.JSONField(default=list, blank=True, verbose_name="روابط الصور")
+    image_variants = models.JSONField(default=list, blank=True, verbose_name="نسخ الصور بأحجام مختلفة")
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -140,3 +145,88 @@ class Payment(models.Model):
 
     def __str__(self):
         return f"Payment of {self.amount} {self.currency} by {self.user.username}"
+
+# Product Analysis Job Model
+class ProductAnalysisJob(models.Model):
+    """
+    مهمة خلفية لاستخراج بيانات المنتج وتحليلها بالذكاء الاصطناعي.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="product_jobs")
+    product_url = models.URLField(max_length=2000, verbose_name="Product URL")
+    force_refresh = models.BooleanField(default=False, verbose_name="تجاهل نتيجة GPT المخزنة")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    result = models.JSONField(default=dict, blank=True, verbose_name="Merged Product Details")
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def __str__(self):
+        return f"{self.product_url} ({self.get_status_display()})"
+
+
+class GPTResponseCache(models.Model):
+    """
+    ذاكرة دائمة لردود GPT، مفتاحها بصمة النموذج والتعليمات والإعدادات.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=50)
+    response = models.JSONField(default=dict)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.model} {self.key[:12]} ({self.hits} hits)"
+
+
+class GPTCallRecord(models.Model):
+    """
+    سجل استدعاء GPT واحد: التوكنات والزمن وعدد المحاولات والتكلفة.
+    """
+    MODE_CHOICES = [
+        ('sync', 'Sync'),
+        ('async', 'Async'),
+        ('stream', 'Stream'),
+        ('batch', 'Batch'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="gpt_calls")
+    model = models.CharField(max_length=50)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='sync')
+    items = models.PositiveIntegerField(default=1, verbose_name="عدد المنتجات في الطلب")
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+    retries = models.PositiveIntegerField(default=0)
+    success = models.BooleanField(default=True)
+    cached = models.BooleanField(default=False)
+    truncated = models.BooleanField(default=False, verbose_name="تم قطع الرد بسبب max_tokens")
+    cost = models.DecimalField(max_digits=12, decimal_places=6, default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.model} {self.mode} {self.prompt_tokens}+{self.completion_tokens} tokens"
@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = "v2"
+
+# ترويسات تُحفظ مع HTML حتى يتم الرد بـ 304 من الذاكرة المؤقتة مباشرة
+CACHED_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def _cache():
+    return caches[settings.LANDING_PAGE_CACHE_ALIAS]
+
+
+def _version_key(slug):
+    return f"lp:{CACHE_VERSION}:version:{slug}"
+
+
+def _content_version(slug):
+    """
+    رقم نسخة محتوى الصفحة. يتغير عند كل حفظ أو حذف، فتصبح النسخ القديمة غير قابلة للوصول.
+    قيمة عشوائية بدل عداد، حتى لا تعود نسخة قديمة إذا حُذف المفتاح من الذاكرة المؤقتة.
+    """
+    cache = _cache()
+    version = cache.get(_version_key(slug))
+    if version is None:
+        cache.add(_version_key(slug), uuid.uuid4().hex, timeout=None)
+        version = cache.get(_version_key(slug))
+    return version
+
+
+def invalidate_landing_page(slug):
+    """إبطال HTML المخزن لصفحة الهبوط."""
+    try:
+        _cache().set(_version_key(slug), uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.error(f"Landing page cache invalidation failed for {slug}: {str(e)}")
+
+
+def landing_page_saved(sender, instance, **kwargs):
+    """يتم ربطها بإشارتي post_save وpost_delete لـ LandingPage في CoreConfig.ready()."""
+    invalidate_landing_page(instance.slug)
+
+
+def landing_page_fields(landing_page):
+    """
+    بيانات صفحة الهبوط كما يعرضها القالب وواجهة JSON، ومنها يُحسب ETag.
+    مشتركة بين views وstatic_export.
+    """
+    return {
+        'title': landing_page.title,
+        'description': landing_page.description,
+        'purchase_url': landing_page.purchase_url,
+        'price': landing_page.price,
+        'usp': landing_page.usp,
+        'benefits': landing_page.benefits,
+        'cta': landing_page.cta,
+        'urgency': landing_page.urgency,
+        'image_urls': landing_page.image_urls,
+        'image_variants': landing_page.image_variants,
+        'slug': landing_page.slug
+    }
+
+
+# ============================
+# الطلبات الشرطية (ETag / 304)
+# ============================
+
+def landing_page_etag(representation, data):
+    """
+    ETag قوي مبني على محتوى الصفحة نفسه وليس على الناتج، حتى يمكن حسابه قبل عرض القالب.
+    representation يميز HTML عن JSON، ويُضاف إليه رقم نسخة القالب حتى يتغير ETag بعد تعديله.
+    """
+    fingerprint = repr((representation, settings.LANDING_PAGE_TEMPLATE_VERSION, sorted(data.items())))
+    return '"%s"' % hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+
+
+def apply_cache_policy(response, etag, last_modified, public):
+    """
+    الصفحات المنشورة يمكن للمتصفح والوسطاء تخزينها لمدة قصيرة، أما المسودات (أو العرض الخاص
+    بمستخدم مسجل) فيجب التحقق منها في كل طلب، وهو رخيص بفضل ETag.
+    """
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    if public:
+        patch_cache_control(response, public=True, max_age=settings.LANDING_PAGE_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_landing_page(request, etag, last_modified, public, build):
+    """
+    إرجاع 304 إذا كانت نسخة العميل مطابقة، وإلا استدعاء build() لإنشاء الرد الكامل.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = build()
+    else:
+        metrics.increment("landing_page.not_modified")
+    return apply_cache_policy(response, etag, last_modified, public)
+
+
+# ============================
+# HTML الصفحات المنشورة
+# ============================
+
+def cached_landing_page(request, slug, render):
+    """
+    إرجاع HTML صفحة منشورة من الذاكرة المؤقتة، أو عرضها عبر render() وتخزينها.
+
+    عند انتهاء صلاحية صفحة عليها زيارات كثيرة، يعرضها عامل واحد (قفل عبر cache.add) بينما ينتظر
+    الباقون النتيجة. إذا انتهى صاحب القفل دون تخزين شيء يتوقف الانتظار فورًا: إما تُعلَّم الصفحة
+    "غير قابلة للتخزين" (غير منشورة أو تحتوي CSRF) فيعرضها كل زائر بنفسه، أو يحاول أحدهم أخذ القفل.
+    render() ترجع None إذا لم تكن الصفحة منشورة، وقد ترجع 304 (لا يُخزن).
+
+    ملاحظة: add() في FileBasedCache (الذاكرة المشتركة الافتراضية) ليست ذرية، لذلك قد يعرض
+    عاملان الصفحة نفسها أحيانًا. هذا يقلل العرض المتزامن ولا يمنعه تمامًا؛ للضمان يلزم Redis أو Memcached.
+    """
+    cache = _cache()
+    try:
+        key = f"lp:{CACHE_VERSION}:html:{slug}:{_content_version(slug)}"
+        cached = cache.get(key)
+    except Exception as e:
+        logger.error(f"Landing page cache read failed for {slug}: {str(e)}")
+        return render()
+
+    lock_key = f"{key}:lock"
+    uncacheable_key = f"{key}:uncacheable"
+    if cached is None and cache.get(uncacheable_key):
+        return render()
+
+    if cached is None and not cache.add(lock_key, 1, timeout=settings.LANDING_PAGE_CACHE_LOCK_TIMEOUT):
+        metrics.increment("landing_page_cache.wait")
+        deadline = time.monotonic() + settings.LANDING_PAGE_CACHE_LOCK_TIMEOUT
+        locked = False
+        while cached is None and not locked and time.monotonic() < deadline:
+            time.sleep(0.05)
+            cached = cache.get(key)
+            if cached is None and cache.get(lock_key) is None:
+                # انتهى صاحب القفل دون تخزين شيء
+                if cache.get(uncacheable_key):
+                    return render()
+                locked = cache.add(lock_key, 1, timeout=settings.LANDING_PAGE_CACHE_LOCK_TIMEOUT)
+        if cached is None and not locked:
+            # العامل الآخر فشل أو تأخر كثيرًا: العرض دون تخزين
+            return render()
+
+    if cached is not None:
+        metrics.increment("landing_page_cache.hit")
+        content, content_type, headers = cached
+        response = HttpResponse(content, content_type=content_type)
+        for name, value in headers.items():
+            response[name] = value
+        # 304 مباشرة من الترويسات المخزنة بدون قاعدة البيانات أو القالب
+        response = get_conditional_response(
+            request,
+            etag=headers.get("ETag"),
+            last_modified=parse_http_date_safe(headers.get("Last-Modified", "")),
+            response=response,
+        )
+        if response.status_code == 304:
+            metrics.increment("landing_page.not_modified")
+        return response
+
+    metrics.increment("landing_page_cache.miss")
+    try:
+        response = render()
+        # الصفحة التي تحتوي رمز CSRF خاصة بهذا الزائر ولا يجوز مشاركتها
+        if response is not None and response.status_code == 200 and not request.META.get("CSRF_COOKIE_USED"):
+            headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+            cache.set(key, (response.content, response['Content-Type'], headers), timeout=settings.LANDING_PAGE_CACHE_TTL)
+        elif response is None or response.status_code != 304:
+            # لا يُخزن لأي زائر (غير منشورة أو خاصة بالزائر): لا داعي لأن ينتظر الآخرون
+            # أما 304 فخاصة بهذا العميل فقط، والصفحة نفسها قابلة للتخزين
+            cache.set(uncacheable_key, 1, timeout=settings.LANDING_PAGE_CACHE_LOCK_TIMEOUT)
+        return response
+    finally:
+        cache.delete(lock_key)
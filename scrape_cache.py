@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import re
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import increment_shared
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = "v1"
+
+# رقم ASIN في روابط أمازون بأشكالها المختلفة
+AMAZON_ASIN_RE = re.compile(
+    r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/ASIN)/([A-Z0-9]{10})(?=[/?#]|$)',
+    re.IGNORECASE,
+)
+
+# معاملات التتبع التي لا تغيّر المنتج المعروض
+TRACKING_PARAMS = {
+    'ref', 'ref_', 'tag', 'psc', 'th', 'smid', 'pf_rd_p', 'pf_rd_r', 'pd_rd_r',
+    'pd_rd_w', 'pd_rd_wg', 'qid', 'sr', 'keywords', 'crid', 'sprefix',
+    'content-id', 'linkcode', 'linkid', 'camp', 'creative', 'creativeasin',
+    'gclid', 'fbclid', 'msclkid', 'dclid', 'mc_cid', 'mc_eid', 'spm',
+}
+
+HOST_PREFIXES = ('www.', 'smile.', 'm.')
+
+STATS_KEYS = ('hits', 'misses', 'negative_hits', 'stores')
+
+
+def _cache():
+    return caches[settings.SCRAPE_CACHE_ALIAS]
+
+
+def canonical_product_key(url):
+    """
+    تحويل رابط المنتج إلى هوية ثابتة للمنتج.
+
+    روابط أمازون تُختصر إلى النطاق ورقم ASIN، وباقي الروابط تُحذف منها
+    معاملات التتبع ويتم ترتيب المعاملات المتبقية.
+    """
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower().split('@')[-1]
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+
+    if host.startswith('amazon.') or '.amazon.' in host:
+        match = AMAZON_ASIN_RE.search(parsed.path)
+        if match:
+            return f"amazon:{host}:{match.group(1).upper()}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    )
+    path = parsed.path.rstrip('/') or '/'
+    canonical = f"{host}{path}"
+    if query:
+        canonical = f"{canonical}?{urlencode(query)}"
+    return canonical
+
+
+def _entry_key(url):
+    digest = hashlib.sha1(canonical_product_key(url).encode('utf-8')).hexdigest()
+    return f"scrape:{CACHE_VERSION}:{digest}"
+
+
+def _incr(name):
+    try:
+        increment_shared(_cache(), f"scrape:{CACHE_VERSION}:stats:{name}")
+    except Exception as e:
+        logger.warning(f"Scrape cache counter update failed: {str(e)}")
+
+
+def get_cached_scrape(url):
+    """إرجاع نتيجة الاستخراج المخزنة لهذا المنتج أو None."""
+    try:
+        product_data = _cache().get(_entry_key(url))
+    except Exception as e:
+        logger.error(f"Scrape cache read failed: {str(e)}")
+        return None
+
+    if product_data is None:
+        _incr('misses')
+        return None
+
+    _incr('negative_hits' if product_data.get('error') else 'hits')
+    return product_data
+
+
+def store_scrape(url, product_data):
+    """
+    حفظ نتيجة الاستخراج، مع مدة أقصر بكثير للنتائج الفاشلة.
+    """
+    timeout = (
+        settings.SCRAPE_CACHE_ERROR_TTL if product_data.get('error')
+        else settings.SCRAPE_CACHE_TTL
+    )
+    if timeout <= 0:
+        return
+    try:
+        _cache().set(_entry_key(url), product_data, timeout=timeout)
+        _incr('stores')
+    except Exception as e:
+        logger.error(f"Scrape cache write failed: {str(e)}")
+
+
+def scrape_cache_stats():
+    """عدادات الإصابة والإخفاق للذاكرة المؤقتة المشتركة."""
+    cache = _cache()
+    keys = {name: f"scrape:{CACHE_VERSION}:stats:{name}" for name in STATS_KEYS}
+    values = cache.get_many(list(keys.values()))
+    stats = {name: values.get(key, 0) for name, key in keys.items()}
+    lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['hits'] + stats['negative_hits']) / lookups, 4) if lookups else 0.0
+    return stats
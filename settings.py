@@ -1,6 +1,5 @@
 import os
 import environ
-import openai  # تأكد من تثبيت مكتبة openai
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -50,8 +49,9 @@ LOGOUT_REDIRECT_URL = '/login/'
 
 
 
-# إعداد محرك الجلسات
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# إعداد محرك الجلسات: القراءة من الذاكرة المؤقتة المشتركة، والكتابة في قاعدة البيانات أيضًا
+SESSION_ENGINE = env('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'shared'  # يجب أن تكون مشتركة بين العمليات حتى لا تُقرأ جلسة قديمة
 
 # تفعيل أمان الكوكيز إذا كنت تستخدم HTTPS
 SESSION_COOKIE_SECURE = True  # اجعلها True فقط إذا كنت تستخدم HTTPS
@@ -117,13 +117,45 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'affiliate_platform.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+# ملف أداء قاعدة البيانات: sqlite (WAL) أو postgres (عبر PgBouncer)
+DATABASE_PROFILE = env('DATABASE_PROFILE', default='sqlite')
+DATABASE_CONN_MAX_AGE = env.int('DATABASE_CONN_MAX_AGE', default=60)  # ثوانٍ لإبقاء الاتصال مفتوحًا بين الطلبات
+
+# تُطبق عند كل اتصال جديد (core.database.apply_sqlite_pragmas)
+SQLITE_PRAGMAS = {
+    'journal_mode': env('SQLITE_JOURNAL_MODE', default='wal'),
+    'synchronous': env('SQLITE_SYNCHRONOUS', default='normal'),  # آمن مع WAL وأسرع من full
+    'busy_timeout': env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000),  # انتظار القفل بدل "database is locked"
+    'mmap_size': env.int('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024),
+    'temp_store': 'memory',
 }
 
+if DATABASE_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env('POSTGRES_DB', default='affiliate_platform'),
+            'USER': env('POSTGRES_USER', default='postgres'),
+            'PASSWORD': env('POSTGRES_PASSWORD', default=''),
+            'HOST': env('POSTGRES_HOST', default='127.0.0.1'),
+            'PORT': env('POSTGRES_PORT', default='6432'),  # منفذ PgBouncer الافتراضي
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # مطلوب مع PgBouncer في وضع transaction pooling
+            'DISABLE_SERVER_SIDE_CURSORS': env.bool('POSTGRES_PGBOUNCER', default=True),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'PRAGMAS': SQLITE_PRAGMAS,
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -145,6 +177,104 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # مسار الملفات الثابتة الإضافية التي يمكن أن تتواجد في المجلد `static`
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# إعدادات مجموعة متصفحات Selenium المستخدمة في استخراج بيانات المنتجات
+SCRAPER_DRIVER_POOL_SIZE = env.int('SCRAPER_DRIVER_POOL_SIZE', default=2)  # الحد الأقصى للمتصفحات المفتوحة
+SCRAPER_DRIVER_MAX_PAGES = env.int('SCRAPER_DRIVER_MAX_PAGES', default=50)  # إعادة تشغيل المتصفح بعد هذا العدد من الصفحات
+SCRAPER_DRIVER_ACQUIRE_TIMEOUT = env.int('SCRAPER_DRIVER_ACQUIRE_TIMEOUT', default=120)  # ثوانٍ لانتظار متصفح متاح
+SCRAPER_DRIVER_PREWARM = env.int('SCRAPER_DRIVER_PREWARM', default=1)  # عدد المتصفحات التي يتم تشغيلها مسبقًا
+
+# مسار ChromeDriver: يُحدد مرة واحدة (manage.py resolve_chromedriver) ثم يعاد استخدامه دون اتصال بالإنترنت
+CHROMEDRIVER_PATH = env('CHROMEDRIVER_PATH', default='')  # مسار ثابت، له الأولوية على ملف manifest
+CHROMEDRIVER_MANIFEST = env('CHROMEDRIVER_MANIFEST', default=os.path.join(BASE_DIR, 'chromedriver.json'))
+CHROMEDRIVER_AUTO_INSTALL = env.bool('CHROMEDRIVER_AUTO_INSTALL', default=False)  # True = التنزيل أثناء الطلبات إذا لم يوجد manifest
+CHROMEDRIVER_RETRY_AFTER = env.int('CHROMEDRIVER_RETRY_AFTER', default=300)  # ثوانٍ قبل إعادة المحاولة بعد فشل التحديد
+
+# الوضع الخفيف لـ Selenium: تحميل eager مع حظر الصور والخطوط والفيديو والمتتبعات
+SCRAPER_LEAN_MODE = env.bool('SCRAPER_LEAN_MODE', default=True)
+# كل امتداد محظور بصيغتين: بدون استعلام ومع استعلام (مثل image.jpg?v=3) لأن النمط يطابق الرابط كاملًا
+SCRAPER_BLOCKED_EXTENSIONS = [
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'ico',
+    'woff', 'woff2', 'ttf', 'otf',
+    'mp4', 'webm', 'm3u8',
+]
+SCRAPER_BLOCKED_URL_PATTERNS = env.list('SCRAPER_BLOCKED_URL_PATTERNS', default=[
+    pattern
+    for extension in SCRAPER_BLOCKED_EXTENSIONS
+    for pattern in (f'*.{extension}', f'*.{extension}?*')
+] + [
+    '*doubleclick.net*', '*googlesyndication.com*', '*google-analytics.com*',
+    '*googletagmanager.com*', '*amazon-adsystem.com*', '*facebook.net*',
+    '*fls-na.amazon.com*', '*unagi.amazon.com*',
+])
+
+SCRAPER_EXTRACT_DEADLINE = env.int('SCRAPER_EXTRACT_DEADLINE', default=20)  # مهلة إجمالية واحدة لجميع حقول المنتج (ثوانٍ)
+
+# المسار السريع: طلب HTTP عادي مع BeautifulSoup قبل اللجوء إلى Selenium
+SCRAPER_HTTP_FAST_PATH = env.bool('SCRAPER_HTTP_FAST_PATH', default=True)
+SCRAPER_HTTP_POOL_SIZE = env.int('SCRAPER_HTTP_POOL_SIZE', default=10)  # عدد الاتصالات المحفوظة لكل مضيف
+SCRAPER_HTTP_TIMEOUT = env.float('SCRAPER_HTTP_TIMEOUT', default=8.0)  # ثوانٍ
+
+# مهام تحليل المنتجات في الخلفية
+PRODUCT_JOB_WORKERS = env.int('PRODUCT_JOB_WORKERS', default=4)  # عدد الخيوط التي تنفذ المهام
+PRODUCT_JOB_POLL_INTERVAL_MS = env.int('PRODUCT_JOB_POLL_INTERVAL_MS', default=1500)  # فترة سؤال المتصفح عن حالة المهمة
+PRODUCT_JOB_HEARTBEAT_INTERVAL = env.int('PRODUCT_JOB_HEARTBEAT_INTERVAL', default=30)  # تحديث updated_at أثناء التنفيذ
+PRODUCT_JOB_STALE_AFTER = env.int('PRODUCT_JOB_STALE_AFTER', default=5 * 60)  # ثوانٍ بدون نبضة قبل اعتبار المهمة عالقة
+
+# نسخ صور المنتجات محليًا مع نسخ مصغرة WebP/JPEG
+IMAGE_MIRROR_ENABLED = env.bool('IMAGE_MIRROR_ENABLED', default=True)
+IMAGE_MIRROR_WORKERS = env.int('IMAGE_MIRROR_WORKERS', default=4)
+IMAGE_MIRROR_TIMEOUT = env.int('IMAGE_MIRROR_TIMEOUT', default=15)  # أقصى انتظار للصور بعد انتهاء تحليل GPT (ثوانٍ)
+IMAGE_MIRROR_MAX_BYTES = env.int('IMAGE_MIRROR_MAX_BYTES', default=10 * 1024 * 1024)
+IMAGE_VARIANT_WIDTHS = [320, 640, 1024]
+
+# الاستيراد الجماعي للمنتجات
+BULK_IMPORT_CONCURRENCY = env.int('BULK_IMPORT_CONCURRENCY', default=8)  # عدد الروابط التي تُحلل في نفس الوقت
+BULK_IMPORT_BATCH_SIZE = env.int('BULK_IMPORT_BATCH_SIZE', default=25)  # عدد الصفحات في كل عملية حفظ
+BULK_IMPORT_MAX_URLS = env.int('BULK_IMPORT_MAX_URLS', default=1000)
+
+# عنوان بديل لـ OpenAI (مثل خادم mock_openai_server لاختبار الحمل)، فارغ = العنوان الرسمي
+OPENAI_BASE_URL = env('OPENAI_BASE_URL', default='')
+
+# اتصالات OpenAI للمسار غير المتزامن
+OPENAI_MAX_CONNECTIONS = env.int('OPENAI_MAX_CONNECTIONS', default=50)  # أقصى عدد اتصالات مفتوحة في نفس الوقت
+OPENAI_TIMEOUT = env.float('OPENAI_TIMEOUT', default=60.0)
+
+# قاطع الدائرة لـ OpenAI: بعد عدد من الأخطاء يتم إرجاع محتوى بديل فورًا بدل الانتظار
+CIRCUIT_BREAKER_CACHE_ALIAS = 'shared'
+OPENAI_BREAKER_FAILURE_THRESHOLD = env.int('OPENAI_BREAKER_FAILURE_THRESHOLD', default=5)
+OPENAI_BREAKER_WINDOW = env.int('OPENAI_BREAKER_WINDOW', default=60)  # ثوانٍ لاحتساب الأخطاء
+OPENAI_BREAKER_RESET_TIMEOUT = env.int('OPENAI_BREAKER_RESET_TIMEOUT', default=30)  # مدة بقاء القاطع مفتوحًا
+
+# طلب احتياطي ثانٍ إذا تجاوز الطلب الأول زمن p95 (يزيد الاستهلاك قليلًا مقابل تقليل التأخير)
+GPT_HEDGE_ENABLED = env.bool('GPT_HEDGE_ENABLED', default=False)
+GPT_HEDGE_MIN_DELAY = env.float('GPT_HEDGE_MIN_DELAY', default=2.0)  # لا يُرسل الطلب الثاني قبل هذه المدة
+GPT_HEDGE_WORKERS = env.int('GPT_HEDGE_WORKERS', default=8)
+
+# الذاكرة الدائمة لردود GPT
+GPT_CACHE_ENABLED = env.bool('GPT_CACHE_ENABLED', default=True)
+GPT_CACHE_MAX_ENTRIES = env.int('GPT_CACHE_MAX_ENTRIES', default=5000)  # يتم حذف الأقدم استخدامًا عند التجاوز
+GPT_CACHE_STATS_ALIAS = 'shared'
+
+# ميزانية التوكنات لطلبات GPT
+GPT_MAX_TOKENS = env.int('GPT_MAX_TOKENS', default=0)  # 0 = حسابه تلقائيًا من حجم بنية الرد المطلوبة
+GPT_PROMPT_TITLE_TOKENS = env.int('GPT_PROMPT_TITLE_TOKENS', default=60)
+GPT_PROMPT_REVIEWS_TOKENS = env.int('GPT_PROMPT_REVIEWS_TOKENS', default=240)  # لجميع المراجعات معًا
+# سعر كل 1000 توكن بالدولار (المدخلات، المخرجات)
+GPT_PRICING = {
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+}
+
+# ملف النصوص الافتراضية لصفحة المعاينة الفارغة (فارغ = الملف المرفق مع التطبيق)
+DEFAULT_COPY_POOL_PATH = env('DEFAULT_COPY_POOL_PATH', default='')
+
+# تحليل عدة منتجات في طلب GPT واحد (الاستيراد الجماعي)
+GPT_BATCH_SIZE = env.int('GPT_BATCH_SIZE', default=5)  # عدد المنتجات في كل طلب
+GPT_BATCH_MAX_TOKENS = env.int('GPT_BATCH_MAX_TOKENS', default=3000)
+
+# قياس أزمنة المراحل
+METRICS_SAMPLE_SIZE = env.int('METRICS_SAMPLE_SIZE', default=1000)  # عدد القياسات المحفوظة لكل مرحلة
+METRICS_MIN_SAMPLES = env.int('METRICS_MIN_SAMPLES', default=20)  # أقل عدد قياسات لاستخدام النسب المئوية في القرارات
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = env('EMAIL_HOST', default='smtp.your-email-provider.com')
 EMAIL_PORT = env.int('EMAIL_PORT', default=587)
@@ -165,6 +295,10 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': 'errors.log',  # اسم ملف السجل (سيتم إنشاؤه في نفس المسار)
         },
+        'metrics_console': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+        },
     },
     'loggers': {
         'django': {
@@ -172,6 +306,11 @@ LOGGING = {
             'level': 'ERROR',  # تسجيل الأخطاء فقط
             'propagate': True,  # نشر السجلات إلى المعالجات الأخرى
         },
+        'core.metrics': {
+            'handlers': ['metrics_console'],  # سطر واحد لكل عملية استخراج أو تحليل
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -180,5 +319,31 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
-}
\ No newline at end of file
+    },
+    # ذاكرة مؤقتة مشتركة بين جميع العمليات (workers)، يمكن استبدالها بـ Redis
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# HTML صفحات الهبوط المنشورة للزوار غير المسجلين، يُبطل تلقائيًا عند الحفظ أو الحذف
+LANDING_PAGE_CACHE_ALIAS = 'shared'
+LANDING_PAGE_CACHE_TTL = env.int('LANDING_PAGE_CACHE_TTL', default=24 * 60 * 60)
+LANDING_PAGE_CACHE_LOCK_TIMEOUT = env.int('LANDING_PAGE_CACHE_LOCK_TIMEOUT', default=10)  # أقصى انتظار لعامل يعرض الصفحة
+LANDING_PAGE_MAX_AGE = env.int('LANDING_PAGE_MAX_AGE', default=60)  # Cache-Control للصفحات المنشورة، المسودات no-cache
+LANDING_PAGE_TEMPLATE_VERSION = env('LANDING_PAGE_TEMPLATE_VERSION', default='1')  # غيّرها بعد تعديل قالب الصفحة لتغيير ETag
+
+# واجهة جلب صفحات الهبوط المجمعة (api/landing-pages/)
+LANDING_PAGE_API_PAGE_SIZE = env.int('LANDING_PAGE_API_PAGE_SIZE', default=50)
+LANDING_PAGE_API_MAX_PAGE_SIZE = env.int('LANDING_PAGE_API_MAX_PAGE_SIZE', default=200)  # وأقصى عدد slugs في الطلب
+
+# نسخة HTML ثابتة من الصفحة عند النشر (مع gzip/brotli) يقدمها الخادم الأمامي مباشرة من MEDIA_ROOT
+LANDING_PAGE_EXPORT_ENABLED = env.bool('LANDING_PAGE_EXPORT_ENABLED', default=True)
+LANDING_PAGE_EXPORT_PREFIX = 'landing_pages'  # media/landing_pages/<slug>/index.html
+
+# التخزين المؤقت لنتائج استخراج المنتجات
+SCRAPE_CACHE_ALIAS = 'shared'
+SCRAPE_CACHE_TTL = env.int('SCRAPE_CACHE_TTL', default=6 * 60 * 60)  # النتائج الناجحة: 6 ساعات
+SCRAPE_CACHE_ERROR_TTL = env.int('SCRAPE_CACHE_ERROR_TTL', default=60)  # النتائج الفاشلة: دقيقة واحدة
\ No newline at end of file
@@ -0,0 +1,245 @@
+import gzip
+import logging
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.template.loader import render_to_string
+
+from .page_cache import landing_page_fields
+
+# brotli اختيارية: بدونها يتم إنشاء نسخة gzip فقط
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+LINK_TAG_RE = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+REL_STYLESHEET_RE = re.compile(r'\brel=["\']?stylesheet\b', re.IGNORECASE)
+HREF_RE = re.compile(r'\bhref=["\']?([^"\'\s>]+)', re.IGNORECASE)
+CSS_URL_RE = re.compile(r'url\(\s*(["\']?)(?!data:|https?:|//|/|#)([^"\')]+)\1\s*\)', re.IGNORECASE)
+
+# النسخ الكاملة لكل صفحة، و<slug> رابط رمزي إلى النسخة الحالية
+VERSIONS_DIR = ".versions"
+
+# تصديران متزامنان لنفس الصفحة داخل العملية قد يحذف أحدهما نسخة الآخر أثناء كتابتها
+_export_lock = threading.Lock()
+
+
+def export_name(slug):
+    return f"{settings.LANDING_PAGE_EXPORT_PREFIX}/{slug}/index.html"
+
+
+def _export_directory(slug):
+    """مسار مجلد الصفحة على القرص، أو None للتخزين البعيد."""
+    try:
+        return default_storage.path(f"{settings.LANDING_PAGE_EXPORT_PREFIX}/{slug}")
+    except NotImplementedError:
+        return None
+
+
+def _read_static(path):
+    """محتوى ملف CSS محلي من مجلدات static أو من STATIC_ROOT بعد collectstatic."""
+    found = finders.find(path)
+    if not found:
+        try:
+            found = staticfiles_storage.path(path)
+        except NotImplementedError:
+            return None
+    if not found or not os.path.isfile(found):
+        return None
+    with open(found, encoding='utf-8') as handle:
+        return handle.read()
+
+
+def inline_stylesheets(html):
+    """
+    استبدال روابط ملفات CSS المحلية بمحتواها داخل <style>، حتى لا يحتاج عرض الصفحة طلبات إضافية.
+    الروابط النسبية داخل CSS تتحول إلى روابط مطلقة لأن الملف لم يعد في مجلد static.
+    """
+    def replace(match):
+        tag = match.group(0)
+        href = HREF_RE.search(tag)
+        if not REL_STYLESHEET_RE.search(tag) or not href or not href.group(1).startswith(settings.STATIC_URL):
+            return tag
+        url = href.group(1).split('?')[0].split('#')[0]
+        css = _read_static(url[len(settings.STATIC_URL):])
+        if css is None:
+            logger.warning(f"Stylesheet not found for inlining: {url}")
+            return tag
+        base = posixpath.dirname(url)
+        css = CSS_URL_RE.sub(
+            lambda css_url: f"url({css_url.group(1)}{posixpath.normpath(posixpath.join(base, css_url.group(2)))}{css_url.group(1)})",
+            css,
+        )
+        return f"<style>{css}</style>"
+
+    return LINK_TAG_RE.sub(replace, html)
+
+
+def _version_directories(slug, root):
+    versions = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(versions):
+        return []
+    return [os.path.join(versions, name) for name in os.listdir(versions) if name.rsplit(".", 1)[0] == slug]
+
+
+def _swap_directory(slug, directory, files):
+    """
+    كتابة جميع الملفات (HTML وgzip وbrotli) في مجلد نسخة جديد، ثم استبدال الرابط الرمزي <slug>
+    بعملية واحدة، فيرى الخادم الأمامي النسخ الثلاث من نفس الإصدار دائمًا.
+    تبقى النسخة السابقة حتى التحديث التالي من أجل الطلبات التي بدأت قراءتها قبل الاستبدال.
+    """
+    root = os.path.dirname(directory)
+    versions = os.path.join(root, VERSIONS_DIR)
+    os.makedirs(versions, exist_ok=True)
+    # النقطة لا تظهر في slug، فلا تختلط نسخ صفحة بنسخ صفحة أخرى يبدأ اسمها بنفس الحروف
+    version = tempfile.mkdtemp(dir=versions, prefix=f"{slug}.")
+    try:
+        for filename, data in files.items():
+            path = os.path.join(version, filename)
+            with open(path, 'wb') as handle:
+                handle.write(data)
+            os.chmod(path, 0o644)
+        os.chmod(version, 0o755)
+
+        previous = os.path.realpath(directory) if os.path.islink(directory) else None
+        if os.path.isdir(directory) and not os.path.islink(directory):
+            # مجلد عادي من الإصدار السابق للتصدير: يُستبدل مرة واحدة فقط
+            shutil.rmtree(directory)
+        link = os.path.join(root, f".tmp-{uuid.uuid4().hex}")
+        os.symlink(os.path.relpath(version, root), link)
+        os.replace(link, directory)
+    except Exception:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+
+    for old in _version_directories(slug, root):
+        if old not in (version, previous):
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _replace_files(name, files):
+    """
+    تخزين بعيد (مثل S3): رفع كل كائن يستبدله دفعة واحدة، لكن لا يمكن استبدال الملفات معًا.
+    النسخ المضغوطة تُرفع أولًا ثم HTML، فتوجد لحظة قصيرة تختلف فيها النسخة المضغوطة عن HTML.
+    """
+    directory = posixpath.dirname(name)
+    for filename, data in files.items():
+        path = f"{directory}/{filename}"
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        if data is not None:
+            default_storage.save(path, ContentFile(data))
+
+
+def export_landing_page(slug, context):
+    """
+    عرض صفحة الهبوط مرة واحدة كملف HTML مستقل مع نسخ gzip/brotli مضغوطة مسبقًا.
+    ترجع رابط الملف ليقدمه الخادم الأمامي أو CDN مباشرة.
+    """
+    html = inline_stylesheets(render_to_string('landing_page_preview.html', {**context, 'static_export': True}))
+    data = html.encode('utf-8')
+    name = export_name(slug)
+
+    # الترتيب مهم للتخزين البعيد: النسخ المضغوطة أولًا ثم HTML
+    files = {"index.html.gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    files["index.html.br"] = brotli.compress(data, quality=11) if brotli is not None else None
+    files["index.html"] = data
+
+    directory = _export_directory(slug)
+    if directory is None:
+        _replace_files(name, files)
+    else:
+        _swap_directory(slug, directory, {filename: data for filename, data in files.items() if data is not None})
+    return default_storage.url(name)
+
+
+def remove_export(slug):
+    """حذف النسخة الثابتة للصفحة (إن وجدت)."""
+    directory = _export_directory(slug)
+    if directory is None:
+        name = export_name(slug)
+        for path in (name, f"{name}.gz", f"{name}.br"):
+            if default_storage.exists(path):
+                default_storage.delete(path)
+        return
+
+    if os.path.islink(directory):
+        os.unlink(directory)
+    elif os.path.isdir(directory):
+        shutil.rmtree(directory)
+    for version in _version_directories(slug, os.path.dirname(directory)):
+        shutil.rmtree(version, ignore_errors=True)
+
+
+def refresh_landing_page_export(landing_page):
+    """
+    إعادة إنشاء النسخة الثابتة لصفحة منشورة، أو حذفها إذا لم تعد منشورة.
+    تعرض القالب وتضغطه (gzip 9 وbrotli 11)، لذلك تُستدعى من الخلفية وليس أثناء الطلب.
+    """
+    if not settings.LANDING_PAGE_EXPORT_ENABLED:
+        return None
+    with _export_lock:
+        if not landing_page.is_published:
+            remove_export(landing_page.slug)
+            return None
+        return export_landing_page(landing_page.slug, {'landing_page': landing_page_fields(landing_page)})
+
+
+def _refresh_export_in_background(page_id):
+    """قراءة الصفحة من جديد، فالتعديلات المتتالية تنتهي دائمًا بآخر نسخة محفوظة."""
+    from .models import LandingPage
+
+    close_old_connections()
+    try:
+        landing_page = LandingPage.objects.filter(pk=page_id).first()
+        if landing_page is not None:
+            refresh_landing_page_export(landing_page)
+    except Exception as e:
+        logger.error(f"Static export failed for landing page {page_id}: {str(e)}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def schedule_landing_page_export(page_id):
+    # الاستيراد هنا لتجنب الاستيراد الدائري: image_mirror يستورد هذه الوحدة
+    from .image_mirror import get_mirror_executor
+
+    transaction.on_commit(lambda: get_mirror_executor().submit(_refresh_export_in_background, page_id))
+
+
+def landing_page_export_saved(sender, instance, **kwargs):
+    """
+    يتم ربطها بإشارة post_save لـ LandingPage في CoreConfig.ready(): النشر وأي تعديل لاحق
+    على صفحة منشورة يعيدان إنشاء نسختها الثابتة في الخلفية بعد حفظ المعاملة.
+    حفظ مسودة لم تُصدَّر من قبل لا يفعل شيئًا؛ مع التخزين البعيد يتم التحقق في الخلفية.
+    """
+    if not settings.LANDING_PAGE_EXPORT_ENABLED:
+        return
+    if not instance.is_published:
+        directory = _export_directory(instance.slug)
+        if directory is not None and not os.path.lexists(directory):
+            return
+    schedule_landing_page_export(instance.pk)
+
+
+def remove_landing_page_export(sender, instance, **kwargs):
+    """يتم ربطها بإشارة post_delete لـ LandingPage في CoreConfig.ready()."""
+    try:
+        remove_export(instance.slug)
+    except Exception as e:
+        logger.error(f"Could not remove static export for {instance.slug}: {str(e)}")
@@ -0,0 +1,599 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import views
+from .bulk_import import iter_bulk_import, parse_url_list
+from .circuit_breaker import CircuitBreaker
+from .extractors import extract_from_soup, get_extractor
+from .json_stream import JSONObjectStream
+from .metrics import increment_shared
+from .management.commands.benchmark_scraper import DEFAULT_CORPUS, score_fields
+from .models import LandingPage
+from .page_cache import CACHE_VERSION, _content_version, cached_landing_page
+from .static_export import export_landing_page, refresh_landing_page_export, remove_export
+from .scrape_cache import canonical_product_key
+
+
+# ============================
+# JSONObjectStream
+# ============================
+
+class JSONObjectStreamTests(SimpleTestCase):
+    def feed_all(self, chunks):
+        stream = JSONObjectStream()
+        fields = []
+        for chunk in chunks:
+            fields.extend(stream.feed(chunk))
+        return fields
+
+    def test_whole_object_in_one_chunk(self):
+        fields = self.feed_all(['{"headline": "Hi", "price": 12, "benefits": ["a", "b"]}'])
+        self.assertEqual(fields, [("headline", "Hi"), ("price", 12), ("benefits", ["a", "b"])])
+
+    def test_every_chunk_boundary(self):
+        payload = {
+            "headline": 'Say "hi" \\ then {leave}, okay',
+            "usp": "منتج مميز",
+            "benefits": [{"title": "a,b", "tags": ["x", "}"]}, "c"],
+            "nested": {"inner": {"deep": [1, 2.5, None, True]}},
+            "count": 125,
+        }
+        raw = json.dumps(payload)
+        expected = list(payload.items())
+        # كل موضع تقسيم ممكن، بما فيه داخل النصوص وعلامات الهروب (\" و\\ و\uXXXX)
+        for split in range(1, len(raw)):
+            with self.subTest(split=split):
+                self.assertEqual(self.feed_all([raw[:split], raw[split:]]), expected)
+        self.assertEqual(self.feed_all(list(raw)), expected)
+        self.assertEqual(self.feed_all(list(json.dumps(payload, ensure_ascii=False, indent=2))), expected)
+
+    def test_field_is_returned_as_soon_as_complete(self):
+        stream = JSONObjectStream()
+        self.assertEqual(stream.feed('{"headline": "Big'), [])
+        self.assertEqual(stream.feed(' sale", "cta": "Bu'), [("headline", "Big sale")])
+        self.assertEqual(stream.feed('y"}'), [("cta", "Buy")])
+        self.assertEqual(stream.feed(''), [])
+
+    def test_number_at_end_of_chunk_waits_for_terminator(self):
+        stream = JSONObjectStream()
+        self.assertEqual(stream.feed('{"count": 12'), [])
+        self.assertEqual(stream.feed('5, "ok": true'), [("count", 125)])
+        self.assertEqual(stream.feed('}'), [("ok", True)])
+
+    def test_text_before_object_is_ignored(self):
+        self.assertEqual(self.feed_all(['Here you go:\n', '{"a": 1}']), [("a", 1)])
+
+
+# ============================
+# canonical_product_key
+# ============================
+
+class CanonicalProductKeyTests(SimpleTestCase):
+    def test_amazon_url_variants_share_a_key(self):
+        urls = [
+            "https://www.amazon.com/Some-Thing/dp/B08N5WRWNW/ref=sr_1_1?keywords=x&qid=1",
+            "https://amazon.com/gp/product/b08n5wrwnw?tag=aff-20&th=1",
+            "https://smile.amazon.com/dp/B08N5WRWNW",
+            "https://m.amazon.com/gp/aw/d/B08N5WRWNW#reviews",
+            "  https://www.amazon.com/dp/B08N5WRWNW/  ",
+        ]
+        self.assertEqual({canonical_product_key(url) for url in urls}, {"amazon:amazon.com:B08N5WRWNW"})
+
+    def test_amazon_marketplaces_and_products_differ(self):
+        self.assertNotEqual(
+            canonical_product_key("https://www.amazon.com/dp/B08N5WRWNW"),
+            canonical_product_key("https://www.amazon.co.uk/dp/B08N5WRWNW"),
+        )
+        self.assertNotEqual(
+            canonical_product_key("https://www.amazon.com/dp/B08N5WRWNW"),
+            canonical_product_key("https://www.amazon.com/dp/B000000000"),
+        )
+
+    def test_tracking_params_and_order_are_ignored(self):
+        self.assertEqual(
+            canonical_product_key("https://example.com/p/1/?utm_source=x&b=2&a=1&gclid=z"),
+            canonical_product_key("https://www.example.com/p/1?a=1&b=2"),
+        )
+
+    def test_meaningful_params_are_kept(self):
+        self.assertNotEqual(
+            canonical_product_key("https://example.com/p?id=1"),
+            canonical_product_key("https://example.com/p?id=2"),
+        )
+
+
+# ============================
+# parse_url_list
+# ============================
+
+class ParseUrlListTests(SimpleTestCase):
+    def test_text_lines_and_whitespace(self):
+        text = "https://a.com/1\r\nnot-a-url\nhttps://b.com/2 https://a.com/1\n\n\tftp://c.com/3"
+        self.assertEqual(parse_url_list(text), ["https://a.com/1", "https://b.com/2"])
+
+    def test_commas_inside_urls_are_kept(self):
+        text = "https://shop.example.org/ip/Foo,Bar/123\nhttps://shop.example.org/p?color=red,blue"
+        self.assertEqual(
+            parse_url_list(text),
+            ["https://shop.example.org/ip/Foo,Bar/123", "https://shop.example.org/p?color=red,blue"],
+        )
+
+    def test_url_list_is_not_split(self):
+        urls = ["https://a.com/p?size=s,m", " https://b.com/2 ", "https://a.com/p?size=s,m", "nope"]
+        self.assertEqual(parse_url_list(urls=urls), ["https://a.com/p?size=s,m", "https://b.com/2"])
+
+    def test_csv_with_url_column(self):
+        csv_file = io.BytesIO("\ufeffname,Product_URL\nMug,https://a.com/mug\nLamp,https://b.com/lamp\n".encode("utf-8"))
+        self.assertEqual(parse_url_list(csv_file=csv_file), ["https://a.com/mug", "https://b.com/lamp"])
+
+    def test_csv_without_header_uses_first_column(self):
+        csv_file = io.StringIO("https://a.com/1,x\nhttps://b.com/2,y\n")
+        self.assertEqual(parse_url_list(csv_file=csv_file), ["https://a.com/1", "https://b.com/2"])
+
+    def test_csv_and_text_are_merged_without_duplicates(self):
+        csv_file = io.StringIO("url\nhttps://a.com/1\n")
+        self.assertEqual(
+            parse_url_list("https://a.com/1\nhttps://b.com/2", csv_file),
+            ["https://a.com/1", "https://b.com/2"],
+        )
+
+    def test_empty_input(self):
+        self.assertEqual(parse_url_list(""), [])
+        self.assertEqual(parse_url_list(csv_file=io.StringIO("")), [])
+
+
+@override_settings(IMAGE_MIRROR_ENABLED=False, LANDING_PAGE_EXPORT_ENABLED=False)
+class BulkImportTests(TestCase):
+    def test_fallback_copy_is_reported_as_failed(self):
+        user = User.objects.create_user("owner", password="x")
+        urls = ["https://shop.example.org/a", "https://shop.example.org/b"]
+
+        def analyze(product_infos, user=None):
+            return [
+                {**views.templated_copy(product_info), "link": product_info["link"]}
+                if product_info["link"].endswith("/a") else
+                {"headline": "Real copy", "subheadline": "", "usp": "", "benefits": [], "cta": "", "urgency": ""}
+                for product_info in product_infos
+            ]
+
+        with mock.patch.object(views, "scrape_product_info", side_effect=lambda url: {"title": "Lamp", "link": url}), \
+                mock.patch.object(views, "analyze_products_with_gpt_batch", side_effect=analyze):
+            events = list(iter_bulk_import(user, urls, concurrency=2))
+
+        outcomes = {event["url"]: event["event"] for event in events if "url" in event}
+        self.assertEqual(outcomes, {urls[0]: "failed", urls[1]: "analyzed"})
+        self.assertEqual(events[-1]["saved"], 1)
+        self.assertEqual(list(LandingPage.objects.values_list("title", flat=True)), ["Real copy"])
+
+    def test_json_url_list_is_passed_through(self):
+        user = User.objects.create_user("owner", password="x")
+        self.client.force_login(user)
+        urls = ["https://shop.example.org/ip/Foo,Bar/123", "https://shop.example.org/p?color=red,blue"]
+        with mock.patch.object(views, "iter_bulk_import", return_value=[]) as bulk_import:
+            response = self.client.post(
+                reverse("bulk_import_products"), json.dumps({"urls": urls}), content_type="application/json"
+            )
+            b"".join(response.streaming_content)
+        bulk_import.assert_called_once_with(user, urls)
+
+
+# ============================
+# المستخرجات على صفحات benchmarks/scrape_corpus
+# ============================
+
+class ExtractorCorpusTests(SimpleTestCase):
+    base_url = "http://corpus.test"
+
+    def test_extractor_selection(self):
+        self.assertEqual(get_extractor("https://www.amazon.com/dp/X")["name"], "amazon")
+        self.assertEqual(get_extractor("https://smile.amazon.co.uk/dp/x")["name"], "amazon")
+        self.assertEqual(get_extractor("https://shop.example.org/p")["name"], "default")
+        self.assertEqual(get_extractor("https://shop.example.org/p", name="amazon")["name"], "amazon")
+
+    def test_corpus_pages(self):
+        from bs4 import BeautifulSoup
+        from .http_scraper import HTML_PARSER
+
+        with open(os.path.join(DEFAULT_CORPUS, "manifest.json"), encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        for page in manifest:
+            with self.subTest(page=page["file"]):
+                with open(os.path.join(DEFAULT_CORPUS, page["file"]), encoding="utf-8") as handle:
+                    soup = BeautifulSoup(handle.read(), HTML_PARSER)
+                base_url = f"{self.base_url}/{page['file']}"
+                fields = extract_from_soup(soup, get_extractor(base_url, name=page["extractor"]), base_url)
+                scores = score_fields(fields, page["expected"], self.base_url)
+                self.assertTrue(all(scores.values()), f"{scores} {fields}")
+
+
+# ============================
+# CircuitBreaker
+# ============================
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests-default"},
+        "breaker": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests-breaker"},
+    },
+    CIRCUIT_BREAKER_CACHE_ALIAS="breaker",
+)
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        caches["breaker"].clear()
+        self.breaker = CircuitBreaker("test", failure_threshold=3, window=60, reset_timeout=30)
+
+    def expire_open_state(self):
+        caches["breaker"].set(self.breaker._key("opened_until"), time.time() - 1, timeout=None)
+
+    def test_opens_after_threshold(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), "closed")
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), "open")
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+        self.assertEqual(self.breaker.stats()["trips"], 1)
+
+    def test_half_open_allows_a_single_probe(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.expire_open_state()
+        self.assertEqual(self.breaker.state(), "half_open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_successful_probe_closes(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.expire_open_state()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state(), "closed")
+        self.assertEqual(self.breaker.stats()["recent_failures"], 0)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_probe_reopens_immediately(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.expire_open_state()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), "open")
+        self.assertEqual(self.breaker.stats()["trips"], 2)
+
+    def test_success_while_closed_keeps_failure_window(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.stats()["recent_failures"], 2)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), "open")
+
+
+class FileBasedCounterTests(SimpleTestCase):
+    """الذاكرة المشتركة الافتراضية FileBasedCache، حيث incr لا تحافظ على مدة المفتاح."""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        settings_override = override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests-default"},
+                "breaker": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+            },
+            CIRCUIT_BREAKER_CACHE_ALIAS="breaker",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.now = time.time()
+        patcher = mock.patch("time.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_counter_without_timeout_survives_idle_periods(self):
+        cache = caches["breaker"]
+        increment_shared(cache, "hits")
+        increment_shared(cache, "hits")
+        self.now += 3600
+        self.assertEqual(increment_shared(cache, "hits"), 3)
+
+    def test_failure_window_does_not_slide(self):
+        breaker = CircuitBreaker("file", failure_threshold=3, window=60, reset_timeout=30)
+        breaker.record_failure()
+        self.now += 50
+        breaker.record_failure()
+        # النافذة الأولى انتهت عند الثانية 60: هذا الخطأ يبدأ نافذة جديدة
+        self.now += 20
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), "closed")
+        self.assertEqual(breaker.stats()["recent_failures"], 1)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), "open")
+
+
+# ============================
+# HTML صفحات الهبوط المنشورة
+# ============================
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests-default"},
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests-shared"},
+}
+
+
+def create_landing_page(user, slug="lamp", **fields):
+    values = {
+        "title": "Desk lamp", "description": "A lamp", "purchase_url": "https://shop.example.org/lamp",
+        "price": "19.99", "usp": "Bright", "cta": "Buy now", "urgency": "Today only", "is_published": True,
+    }
+    values.update(fields)
+    return LandingPage.objects.create(user=user, slug=slug, **values)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, LANDING_PAGE_CACHE_ALIAS="shared", LANDING_PAGE_EXPORT_ENABLED=False)
+class LandingPageCacheTests(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.user = User.objects.create_user("owner", password="x")
+        self.page = create_landing_page(self.user)
+        self.url = reverse("landing_page_preview_with_slug", args=[self.page.slug])
+
+    def test_published_page_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+
+    def test_save_invalidates_cached_html(self):
+        self.client.get(self.url)
+        self.page.title = "Floor lamp"
+        self.page.save()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_unpublished_page_redirects_anonymous_visitors(self):
+        create_landing_page(self.user, slug="draft", is_published=False)
+        response = self.client.get(reverse("landing_page_preview_with_slug", args=["draft"]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_waiter_stops_when_holder_stores_nothing(self):
+        request = RequestFactory().get("/lp/missing/")
+        key = f"lp:{CACHE_VERSION}:html:missing:{_content_version('missing')}"
+        cache = caches["shared"]
+        # عامل آخر يعرض الصفحة ثم ينتهي دون تخزين شيء
+        cache.add(f"{key}:lock", 1)
+        threading.Timer(0.2, cache.delete, args=[f"{key}:lock"]).start()
+
+        started = time.monotonic()
+        response = cached_landing_page(request, "missing", lambda: HttpResponse("rendered"))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(response.content, b"rendered")
+
+    def test_uncacheable_result_is_not_waited_for(self):
+        request = RequestFactory().get("/lp/missing/")
+        self.assertIsNone(cached_landing_page(request, "missing", lambda: None))
+        key = f"lp:{CACHE_VERSION}:html:missing:{_content_version('missing')}"
+        caches["shared"].add(f"{key}:lock", 1)
+
+        started = time.monotonic()
+        self.assertIsNone(cached_landing_page(request, "missing", lambda: None))
+        self.assertLess(time.monotonic() - started, 1)
+
+
+# ============================
+# الطلبات الشرطية (ETag / 304)
+# ============================
+
+@override_settings(CACHES=LOCMEM_CACHES, LANDING_PAGE_CACHE_ALIAS="shared", LANDING_PAGE_EXPORT_ENABLED=False)
+class ConditionalLandingPageTests(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.user = User.objects.create_user("owner", password="x")
+        self.page = create_landing_page(self.user)
+        self.url = reverse("landing_page_preview_with_slug", args=[self.page.slug])
+
+    def test_published_page_is_public_and_revalidates_to_304(self):
+        response = self.client.get(self.url)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertTrue(response.has_header("Last-Modified"))
+        etag = response["ETag"]
+
+        # من الترويسات المخزنة مباشرة، بدون قاعدة البيانات
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_changes_after_edit(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.page.price = "24.99"
+        self.page.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_owner_json_is_private(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json()["slug"], self.page.slug)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        response = self.client.get(self.url, HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_html_and_json_etags_differ(self):
+        self.client.force_login(self.user)
+        html_etag = self.client.get(self.url)["ETag"]
+        json_etag = self.client.get(self.url, HTTP_ACCEPT="application/json")["ETag"]
+        self.assertNotEqual(html_etag, json_etag)
+
+    def test_api_revalidates_to_304(self):
+        url = reverse("get_landing_page", args=[self.page.slug])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+# ============================
+# واجهة جلب صفحات الهبوط المجمعة
+# ============================
+
+@override_settings(LANDING_PAGE_EXPORT_ENABLED=False)
+class BulkLandingPageApiTests(TestCase):
+    def setUp(self):
+        self.url = reverse("get_landing_pages")
+        self.user = User.objects.create_user("owner", password="x")
+        self.other = User.objects.create_user("other", password="x")
+        self.published = [create_landing_page(self.user, slug=f"page-{i}") for i in range(3)]
+        self.draft = create_landing_page(self.user, slug="draft", is_published=False)
+        self.foreign_draft = create_landing_page(self.other, slug="foreign-draft", is_published=False)
+
+    def test_slugs_with_sparse_fields(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"slugs": "page-0,page-2,missing", "fields": "slug,price"})
+        self.assertEqual(
+            response.json(),
+            {"results": [{"slug": "page-2", "price": "19.99"}, {"slug": "page-0", "price": "19.99"}], "next": None},
+        )
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(self.url, {"slugs": "page-0", "fields": "slug,user__password"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_drafts_are_visible_to_their_owner_only(self):
+        params = {"slugs": "page-0,draft,foreign-draft", "fields": "slug"}
+        self.assertEqual([row["slug"] for row in self.client.get(self.url, params).json()["results"]], ["page-0"])
+        self.client.force_login(self.user)
+        self.assertEqual(
+            [row["slug"] for row in self.client.get(self.url, params).json()["results"]], ["draft", "page-0"]
+        )
+
+    def test_mine_requires_login(self):
+        self.assertEqual(self.client.get(self.url, {"mine": "1"}).status_code, 401)
+
+    def test_cursor_pages_through_all_results(self):
+        self.client.force_login(self.user)
+        slugs, cursor = [], None
+        while True:
+            params = {"mine": "1", "fields": "slug", "limit": "2"}
+            if cursor:
+                params["cursor"] = cursor
+            data = self.client.get(self.url, params).json()
+            slugs += [row["slug"] for row in data["results"]]
+            cursor = data["next"]
+            if cursor is None:
+                break
+        self.assertEqual(slugs, ["draft", "page-2", "page-1", "page-0"])
+
+    def test_invalid_limit(self):
+        self.assertEqual(self.client.get(self.url, {"slugs": "page-0", "limit": "0"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"slugs": "page-0", "cursor": "x"}).status_code, 400)
+
+
+# ============================
+# النسخة الثابتة من صفحات الهبوط
+# ============================
+
+class StaticExportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, LANDING_PAGE_EXPORT_ENABLED=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.root = os.path.join(self.media_root, "landing_pages")
+        self.user = User.objects.create_user("owner", password="x")
+
+    def read_export(self, slug, filename="index.html"):
+        with open(os.path.join(self.root, slug, filename), "rb") as handle:
+            return handle.read()
+
+    def versions(self, slug):
+        return [name for name in os.listdir(os.path.join(self.root, ".versions")) if name.startswith(f"{slug}.")]
+
+    def test_export_swaps_versions_atomically(self):
+        export_landing_page("lamp", {"landing_page": {"title": "First"}})
+        self.assertTrue(os.path.islink(os.path.join(self.root, "lamp")))
+        self.assertIn(b"First", self.read_export("lamp"))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "lamp", "index.html.gz")))
+
+        for title in ("Second", "Third"):
+            export_landing_page("lamp", {"landing_page": {"title": title}})
+        self.assertIn(b"Third", self.read_export("lamp"))
+        # النسخة الحالية والسابقة فقط
+        self.assertEqual(len(self.versions("lamp")), 2)
+
+    def test_remove_export_deletes_link_and_versions(self):
+        export_landing_page("lamp", {"landing_page": {"title": "First"}})
+        export_landing_page("lamp-2", {"landing_page": {"title": "Other"}})
+        remove_export("lamp")
+        self.assertFalse(os.path.lexists(os.path.join(self.root, "lamp")))
+        self.assertEqual(self.versions("lamp"), [])
+        self.assertIn(b"Other", self.read_export("lamp-2"))
+
+    def test_unpublishing_removes_export(self):
+        page = create_landing_page(self.user)
+        refresh_landing_page_export(page)
+        self.assertTrue(os.path.lexists(os.path.join(self.root, "lamp")))
+        page.is_published = False
+        refresh_landing_page_export(page)
+        self.assertFalse(os.path.lexists(os.path.join(self.root, "lamp")))
+
+    def test_saves_schedule_export_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            page = create_landing_page(self.user)
+        self.assertEqual(len(callbacks), 1)
+        # مسودة لم تُصدَّر من قبل: لا عمل في الخلفية
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_landing_page(self.user, slug="draft", is_published=False)
+        self.assertEqual(callbacks, [])
+
+        refresh_landing_page_export(page)
+        page.is_published = False
+        with self.captureOnCommitCallbacks() as callbacks:
+            page.save()
+        self.assertEqual(len(callbacks), 1)
+
+
+# ============================
+# تشغيل المتصفحات مسبقًا
+# ============================
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, LANDING_PAGE_CACHE_ALIAS="shared", LANDING_PAGE_EXPORT_ENABLED=False,
+    SCRAPER_DRIVER_PREWARM=1,
+)
+class DriverPrewarmTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="x")
+        patcher = mock.patch.object(views, "get_driver_pool")
+        self.get_driver_pool = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_landing_page_visits_do_not_start_chrome(self):
+        page = create_landing_page(self.user)
+        self.client.get(reverse("landing_page_preview_with_slug", args=[page.slug]))
+        self.get_driver_pool.assert_not_called()
+
+    def test_url_entry_page_starts_chrome(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("product_selection"))
+        self.get_driver_pool.assert_called_once_with()
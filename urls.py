@@ -40,8 +40,12 @@ urlpatterns = [
 
     # ======== إدارة المنتجات وصفحات الهبوط ========
     path('api/fetch-product-details/', views.fetch_product_details, name='fetch_product_details'),
+    path('api/bulk-import/', views.bulk_import_products, name='bulk_import_products'),
+    path('metrics/', views.performance_metrics, name='performance_metrics'),
     path('product_selection/', views.product_selection, name='product_selection'),
     path('product_preview/', views.product_preview, name='product_preview'),
+    path('api/product-jobs/<uuid:job_id>/', views.product_job_status, name='product_job_status'),
+    path('api/product-copy/stream/', views.stream_product_copy, name='stream_product_copy'),
     path('save_product_details/', views.save_product_details, name='save_product_details'),
     path('upload_images/', views.upload_images, name='upload_images'),
     path('delete_image/', views.delete_image, name='delete_image'),
@@ -52,6 +56,7 @@ urlpatterns = [
     path('publish/<slug:slug>/', views.publish_landing_page, name='publish_landing'),
     path('public-landing-page/', views.public_landing_page, name='public_landing_page'),
     path('api/get-landing-page/<slug:slug>/', views.get_landing_page, name='get_landing_page'),
+    path('api/landing-pages/', views.get_landing_pages, name='get_landing_pages'),
     path('api/update-landing-page/<slug>/', views.save_landing_page, name='update_landing_page'),
     path('save_landing_page/', views.save_landing_page, name='save_landing_page'),
 ]
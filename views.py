@@ -1,22 +1,41 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.core.handlers.asgi import ASGIRequest
 from django.core.management import call_command
 from django.conf import settings
 from django.db import IntegrityError
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.utils.text import slugify
 from django.db.models import Q
 from django.core.files.storage import default_storage
 
 
-from .models import Wallet, Campaign, LandingPage
+from .models import Wallet, Campaign, LandingPage, ProductAnalysisJob
 from .forms import CampaignForm
+from .driver_pool import DriverPool
+from .chromedriver import get_chromedriver_path
+from .http_scraper import scrape_product_info_static
+from .extractors import extract_with_driver, get_extractor
+from . import metrics
+from .scrape_cache import get_cached_scrape, scrape_cache_stats, store_scrape
+from .gpt_cache import get_cached_response, gpt_cache_key, gpt_cache_stats, store_response
+from .json_stream import JSONObjectStream
+from .circuit_breaker import CircuitBreaker
+from .executors import lazy_executor
+from .default_copy import pick_default_copy
+from .page_cache import cached_landing_page, conditional_landing_page, landing_page_etag, landing_page_fields
+from .gpt_usage import UsageTotals, estimate_tokens, record_gpt_call, truncate_to_tokens, usage_by_day
+from .jobs import create_product_job
+from .bulk_import import iter_bulk_import, parse_url_list
 
 from utils.landing_page_generator import extract_product_details, generate_landing_page
 from utils.google_ads import create_google_ad
@@ -26,35 +45,29 @@ from utils.simulation import simulate_campaign_performance
 from utils.alerts import check_performance_alerts
 from utils.paypal_integration import create_payment, find_payment
 from decimal import Decimal, InvalidOperation
+from asgiref.sync import sync_to_async
 
 
+import asyncio
+import atexit
+import concurrent.futures
+import functools
 import logging
 import json
 import os
 import re
 import random
 import string
+import threading
 import time
+import weakref
 
-from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError, Completion
 from requests.exceptions import RequestException
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup
 import requests
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-
-from functools import lru_cache
-from django.core.cache import cache
-from tenacity import retry, stop_after_attempt, wait_fixed
+# openai وselenium وwebdriver_manager وtenacity يتم استيرادها عند أول استخدام،
+# حتى لا يدفع كل عامل وكل أمر إداري وقت تحميلها عند الإقلاع
 
 
 
@@ -66,22 +79,47 @@ USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
 ]
 
-cache.clear()
-
-time.sleep(random.uniform(1.5, 4.5))
-
 # إعداد سجلات الأخطاء
 logger = logging.getLogger(__name__)
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
+openai_api_key = settings.OPENAI_API_KEY
 if not openai_api_key:
     raise ValueError("OpenAI API key is not set. Please check your settings.")
-client = OpenAI(api_key=openai_api_key)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """
+    عميل OpenAI المتزامن المشترك، يتم إنشاؤه عند أول طلب.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+
+            _client = OpenAI(api_key=openai_api_key, base_url=settings.OPENAI_BASE_URL or None)
+        return _client
+
+GPT_MODEL = "gpt-3.5-turbo"
+GPT_TEMPERATURE = 0.7
 
 # ============================
 # الدوال العامة
 # ============================
 
+def async_login_required(view_func):
+    """
+    مثل login_required لكن للـ views غير المتزامنة (غير مدعومة في Django 4.x).
+    """
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
 @login_required
 def home(request):
     """
@@ -373,8 +411,7 @@ def delete_campaign(request, campaign_id):
     return redirect('campaigns_list')
 
 # ============================
-@csrf_exempt
-def fetch_product_details(request):
+async def fetch_product_details(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
@@ -382,13 +419,23 @@ def fetch_product_details(request):
             if not product_url:
                 return JsonResponse({"success": False, "error": "URL is required"})
             
-            result = analyze_product_with_gpt(product_url)
-            if "error" in result:
-                return JsonResponse({"success": False, "error": result["error"]})
+            # الاستخراج يبقى متزامنًا (Selenium)، لذلك يعمل في خيط منفصل
+            product_info = await sync_to_async(scrape_product_info, thread_sensitive=False)(product_url)
+            if product_info.get('error'):
+                return JsonResponse({"success": False, "error": product_info['error']})
+
+            try:
+                gpt_data = await analyze_product_with_gpt_async(product_info, user=request.user)
+            finally:
+                if not isinstance(request, ASGIRequest):
+                    # تحت WSGI تنتهي حلقة هذا الطلب بعد الرد، فلا فائدة من إبقاء اتصالات العميل
+                    await close_async_openai_client()
+            if "error" in gpt_data:
+                return JsonResponse({"success": False, "error": gpt_data["error"]})
+            result = {**product_info, **gpt_data, 'link': product_url}
             
             # حفظ البيانات في الجلسة
-            request.session["product_details"] = result
-            request.session.modified = True
+            await sync_to_async(_store_product_details)(request, result)
             
             return JsonResponse({"success": True, "data": result})
         
@@ -396,6 +443,59 @@ def fetch_product_details(request):
             return JsonResponse({"success": False, "error": str(e)})
     return JsonResponse({"success": False, "error": "Invalid method"})
 
+# csrf_exempt في Django 4.x يغلف الـ view بدالة متزامنة، لذلك نضع العلامة مباشرة
+fetch_product_details.csrf_exempt = True
+
+
+def _store_product_details(request, product_details):
+    request.session["product_details"] = product_details
+    request.session.modified = True
+
+# ============================
+@login_required
+def bulk_import_products(request):
+    """
+    استيراد مجموعة روابط منتجات (JSON أو ملف CSV) وتحليلها بالتوازي.
+
+    يتم بث التقدم لكل رابط كسطر JSON منفصل (NDJSON) أثناء التنفيذ.
+    """
+    if request.method != "POST":
+        return JsonResponse({"success": False, "error": "Invalid method"})
+
+    try:
+        if request.content_type == "application/json":
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+            urls = data.get("urls", [])
+            # قائمة روابط كما هي، أو نص بروابط مفصولة بأسطر جديدة
+            if isinstance(urls, list) and all(isinstance(url, str) for url in urls):
+                urls = parse_url_list(urls=urls)
+            elif isinstance(urls, str):
+                urls = parse_url_list(urls)
+            else:
+                raise ValueError('"urls" must be a list of strings or newline-separated text')
+        else:
+            urls = parse_url_list(request.POST.get("urls", ""), request.FILES.get("csv_file"))
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({"success": False, "error": f"Invalid input: {str(e)}"})
+
+    if not urls:
+        return JsonResponse({"success": False, "error": "No valid URLs provided"})
+    if len(urls) > settings.BULK_IMPORT_MAX_URLS:
+        return JsonResponse({
+            "success": False,
+            "error": f"Too many URLs (max {settings.BULK_IMPORT_MAX_URLS})"
+        })
+
+    def stream():
+        for event in iter_bulk_import(request.user, urls):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    response = StreamingHttpResponse(stream(), content_type="application/x-ndjson")
+    response["X-Accel-Buffering"] = "no"  # تعطيل التخزين المؤقت في nginx حتى يصل التقدم فورًا
+    return response
+
 # ============================
 @staff_member_required
 def create_superuser(request):
@@ -419,6 +519,22 @@ def run_migrations(request):
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)})
 
+# ============================
+@staff_member_required
+def performance_metrics(request):
+    """
+    عرض أزمنة مراحل الاستخراج وتحليل GPT (p50/p95/p99) لكل نطاق.
+    القيم خاصة بعملية الخادم الحالية فقط.
+    """
+    data = metrics.snapshot()
+    data["scrape_cache"] = scrape_cache_stats()
+    data["gpt_cache"] = gpt_cache_stats()
+    data["gpt_usage"] = usage_by_day(days=7)
+    data["circuit_breakers"] = {"openai": openai_breaker.stats()}
+    # لا ننشئ مجموعة المتصفحات هنا حتى لا يتم تشغيل Chrome من أجل صفحة القياسات
+    data["driver_pool"] = _driver_pool.stats() if _driver_pool is not None else None
+    return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+
 # ============================
 def custom_login(request):
     """
@@ -441,7 +557,7 @@ def test_openai_connection(request):
     اختبار اتصال OpenAI API.
     """
     try:
-        response = client.ChatCompletion.create(
+        response = get_openai_client().ChatCompletion.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a helpful assistant."},
@@ -456,8 +572,8 @@ def test_openai_connection(request):
 # ============================
 # اختيار المنتج وتحليل الرابط
 # ============================
-@login_required
-def product_selection(request):
+@async_login_required
+async def product_selection(request):
     if request.method == 'POST':
         product_url = request.POST.get('product_url', '').strip()
         
@@ -466,40 +582,85 @@ def product_selection(request):
             return redirect('product_selection')
         
         try:
-            # استخراج البيانات الأساسية
-            product_info = scrape_product_info(product_url)
-            logger.debug(f"Product info: {product_info}")
-            if product_info.get('error'):
-                messages.error(request, f"خطأ في التحليل: {product_info['error']}")
-                return redirect('product_selection')
-            
-            # تحليل البيانات باستخدام الذكاء الاصطناعي
-            gpt_data = analyze_product_with_gpt(product_info)
-            logger.debug(f"GPT data: {gpt_data}")
-            if "error" in gpt_data:
-                messages.error(request, f"خطأ في التحليل: {gpt_data['error']}")
-                return redirect('product_selection')
-            
-            # دمج البيانات
-            merged_data = {
-                **product_info,
-                **gpt_data,
-                'link': product_url
-            }
-            
-            # حفظ في الجلسة
-            request.session['product_details'] = merged_data
-            messages.success(request, "تم تحليل المنتج بنجاح!")
-            return redirect('product_preview')
+            # إنشاء مهمة خلفية بدلًا من انتظار الاستخراج والتحليل داخل الطلب
+            job = await sync_to_async(_start_product_job)(
+                request, product_url, bool(request.POST.get('regenerate'))
+            )
+            messages.info(request, "جاري تحليل المنتج، سيتم عرض النتيجة فور جاهزيتها.")
+            return redirect(f"{reverse('product_preview')}?job={job.pk}")
             
         except Exception as e:
             logger.error(f"خطأ فني: {str(e)}", exc_info=True)
             messages.error(request, f"حدث خطأ غير متوقع: {str(e)}")
             return redirect('product_selection')
 
-    return render(request, 'product_selection.html')
+    await sync_to_async(prewarm_driver_pool)()
+    return await sync_to_async(render)(request, 'product_selection.html')
+
+
+def _start_product_job(request, product_url, force_refresh):
+    job = create_product_job(request.user, product_url, force_refresh=force_refresh)
+    request.session['product_job_id'] = str(job.pk)
+    return job
+
+# ============================
+@login_required
+def product_job_status(request, job_id):
+    """
+    حالة مهمة تحليل المنتج. ترجع فورًا، والمتصفح يعيد السؤال كل PRODUCT_JOB_POLL_INTERVAL_MS
+    حتى لا يحجز كل تبويب مفتوح عامل WSGI طوال مدة المهمة.
+    """
+    job = get_object_or_404(ProductAnalysisJob, pk=job_id, user=request.user)
+
+    # حفظ النتيجة في الجلسة فقط إذا كانت هذه هي المهمة الحالية للمستخدم
+    if job.status == ProductAnalysisJob.STATUS_DONE and request.session.get('product_job_id') == str(job.pk):
+        _store_job_result(request, job)
+
+    return JsonResponse({
+        "success": job.status != ProductAnalysisJob.STATUS_FAILED,
+        "status": job.status,
+        "error": job.error or None,
+        "data": job.result if job.status == ProductAnalysisJob.STATUS_DONE else None,
+    })
+
+
+def _store_job_result(request, job):
+    """حفظ نتيجة المهمة في الجلسة لتستخدمها صفحة المعاينة."""
+    request.session['product_details'] = job.result
+    request.session.pop('product_job_id', None)
+    request.session.modified = True
+
+# ============================
+@login_required
+def stream_product_copy(request):
+    """
+    بث نص صفحة الهبوط عبر Server-Sent Events: يُرسل كل حقل فور اكتماله في رد GPT،
+    ثم تُحفظ النتيجة النهائية في الجلسة. ?refresh=1 يتجاهل الرد المخزن.
+    """
+    product_details = request.session.get('product_details') or {}
+    if not product_details.get('title'):
+        return JsonResponse({"success": False, "error": "No product selected"}, status=400)
+    force_refresh = request.GET.get('refresh') == '1'
+
+    def event_stream():
+        for event in stream_product_copy_with_gpt(product_details, force_refresh=force_refresh, user=request.user):
+            if event['event'] == 'done':
+                # الجلسة حُفظت قبل بدء البث، لذلك نحفظ النتيجة صراحةً عند الانتهاء
+                request.session['product_details'] = {**product_details, **event['data']}
+                request.session.save()
+            yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 # ============================
 def setup_selenium():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     options = Options()
     
     # إعدادات التهيئة المتقدمة
@@ -521,105 +682,193 @@ def setup_selenium():
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--ignore-certificate-errors")
     
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+    # سجل الشبكة لحساب حجم البيانات المنقولة في كل عملية استخراج
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    
+    # الوضع الخفيف: عدم انتظار الصور والإطارات لأننا نقرأ عناصر DOM فقط
+    if settings.SCRAPER_LEAN_MODE:
+        options.page_load_strategy = "eager"
+    
+    # المسار يُحدد مرة واحدة لكل عملية (resolve_chromedriver)، دون فحص النسخة عبر الشبكة
+    service = Service(get_chromedriver_path())
+    with metrics.span("chrome.launch"):
+        driver = webdriver.Chrome(service=service, options=options)
     
     # إضافة خصائص التمويه
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     
+    # حظر الموارد الثقيلة والمتتبعات؛ تبقى خاصية src للصور موجودة في DOM
+    if settings.SCRAPER_LEAN_MODE:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": settings.SCRAPER_BLOCKED_URL_PATTERNS})
+    
     return driver
 
+
+def drain_transferred_bytes(driver):
+    """
+    قراءة سجل الشبكة وإرجاع مجموع البايتات المنقولة منذ آخر قراءة.
+    """
+    from selenium.common.exceptions import WebDriverException
+
+    total = 0
+    try:
+        for entry in driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            if message.get("method") == "Network.loadingFinished":
+                total += int(message["params"].get("encodedDataLength", 0))
+    except (WebDriverException, KeyError, ValueError) as e:
+        logger.debug(f"Could not read performance log: {str(e)}")
+    return total
+
 #================================================
-# استخراج معلومات المنتج باستخدام lru_cache للتخزين المؤقت
+# مجموعة المتصفحات المشتركة بين الطلبات
+
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """
+    إرجاع مجموعة المتصفحات المشتركة، وإنشاؤها عند أول استخدام.
+    """
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool(
+                factory=setup_selenium,
+                max_size=settings.SCRAPER_DRIVER_POOL_SIZE,
+                max_pages=settings.SCRAPER_DRIVER_MAX_PAGES,
+                acquire_timeout=settings.SCRAPER_DRIVER_ACQUIRE_TIMEOUT,
+                user_agents=USER_AGENTS,
+            )
+            atexit.register(_driver_pool.close)
+            if settings.SCRAPER_DRIVER_PREWARM:
+                # تشغيل المتصفحات في الخلفية حتى لا ينتظر الطلب الحالي
+                threading.Thread(
+                    target=_driver_pool.warm,
+                    args=(settings.SCRAPER_DRIVER_PREWARM,),
+                    daemon=True,
+                ).start()
+        return _driver_pool
+
+
+def prewarm_driver_pool():
+    """
+    بدء تشغيل المتصفحات في الخلفية من صفحات الاستخراج فقط (مثل صفحة إدخال الرابط)،
+    قبل أن يصل طلب الاستخراج. زيارات صفحات الهبوط لا تشغل Chrome في عمال الويب.
+    """
+    if settings.SCRAPER_DRIVER_PREWARM:
+        get_driver_pool()
+
+#================================================
+# استخراج معلومات المنتج مع ذاكرة مؤقتة مشتركة بين العمليات
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(10))
-@lru_cache(maxsize=100)
 def scrape_product_info(url):
-    driver = setup_selenium()
+    """
+    استخراج بيانات المنتج، مع استخدام النتيجة المخزنة لنفس المنتج إن وجدت.
+    """
+    with metrics.trace("scrape", metrics.domain_of(url)) as trace_fields:
+        product_data = get_cached_scrape(url)
+        if product_data is not None:
+            trace_fields["cache"] = "hit"
+            return product_data
+
+        trace_fields["cache"] = "miss"
+        product_data = _scrape_product_info(url)
+        trace_fields["source"] = product_data.get('source')
+        store_scrape(url, product_data)
+        return product_data
+
+
+def _scrape_product_info(url):
+    """حتى 3 محاولات بفاصل 10 ثوانٍ عند حدوث استثناء."""
+    from tenacity import Retrying, stop_after_attempt, wait_fixed
+
+    def count_retry(retry_state):
+        metrics.increment("scrape.retry", metrics.domain_of(url))
+
+    for attempt in Retrying(stop=stop_after_attempt(3), wait=wait_fixed(10), before_sleep=count_retry):
+        with attempt:
+            return _scrape_product_info_once(url)
+
+
+def _scrape_product_info_once(url):
+    # المسار السريع: معظم الصفحات لا تحتاج إلى متصفح كامل
+    if settings.SCRAPER_HTTP_FAST_PATH:
+        product_data = scrape_product_info_static(url, USER_AGENTS)
+        if product_data is not None:
+            return product_data
+        logger.info(f"Falling back to Selenium for: {url}")
+
+    return scrape_product_info_selenium(url)
+
+
+def scrape_product_info_selenium(url, extractor=None):
+    """
+    استخراج بيانات المنتج عبر متصفح من مجموعة المتصفحات.
+    """
+    from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+
+    domain = metrics.domain_of(url)
+    pool = get_driver_pool()
     product_data = {
         'title': 'N/A',
         'price': 'N/A',
         'reviews': ['', '', ''],
         'image_urls': [],
-        'error': None
+        'error': None,
+        'source': 'selenium'
     }
     
-    try:
-        # إعدادات متقدمة للتحميل
-        driver.set_page_load_timeout(180)  # زيادة وقت التحميل إلى 180 ثانية
-        driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-            "userAgent": random.choice(USER_AGENTS)
-        })
-        
-        logger.info(f"Navigating to: {url}")
-        driver.get(url)
-        
-        # انتظار متقدم مع تحقق من عناصر متعددة
-        wait = WebDriverWait(driver, 60)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'body')))
-        
-        # التحقق من وجود العناصر الرئيسية
-        title_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '#productTitle')))
-        product_data['title'] = title_element.text.strip() or 'N/A'
-        
+    with pool.lease() as driver:
         try:
-            price_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.a-price-whole')))
-            product_data['price'] = price_element.text.strip() or 'N/A'
-        except TimeoutException:
-            logger.warning("Price element not found, trying alternative selector")
-            try:
-                price_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '#priceblock_ourprice')))
-                product_data['price'] = price_element.text.strip() or 'N/A'
-            except TimeoutException:
-                product_data['price'] = 'Price not found'
-        
-        # استخراج الصور
-        images = driver.find_elements(By.CSS_SELECTOR, '#main-image-container img')
-        product_data['image_urls'] = [img.get_attribute('src') for img in images[:5] if img.get_attribute('src')]
-        
-        # استخراج التقييمات
-        reviews = driver.find_elements(By.CSS_SELECTOR, '[data-hook="review-collapsed"]')
-        product_data['reviews'] = [review.text.strip() for review in reviews[:3]]
-        
-    except TimeoutException as e:
-        product_data['error'] = f"لم يتم تحميل الصفحة خلال الوقت المحدد: {str(e)}"
-        logger.error(f"Timeout Error: {str(e)}")
-    except NoSuchElementException as e:
-        product_data['error'] = f"عنصر مفقود في الصفحة: {str(e)}"
-        logger.error(f"Missing Element: {str(e)}")
-    except WebDriverException as e:
-        product_data['error'] = f"خطأ في متصفح Selenium: {str(e)}"
-        logger.error(f"Selenium Error: {str(e)}")
-    except Exception as e:
-        product_data['error'] = f"خطأ غير متوقع: {str(e)}"
-        logger.error(f"Critical Error: {str(e)}")
-    finally:
-        try:
-            driver.quit()
+            # إعدادات متقدمة للتحميل
+            driver.set_page_load_timeout(180)  # زيادة وقت التحميل إلى 180 ثانية
+            
+            logger.info(f"Navigating to: {url}")
+            drain_transferred_bytes(driver)  # تجاهل ما تبقى من الصفحة السابقة
+            with metrics.span("page.load", domain):
+                driver.get(url)
+            
+            # تقييم جميع المحددات معًا مع مهلة إجمالية واحدة بدلًا من انتظار كل محدد
+            extractor = extractor or get_extractor(url)
+            with metrics.span("extract", domain):
+                fields = extract_with_driver(driver, extractor, settings.SCRAPER_EXTRACT_DEADLINE)
+            if not fields.get('title'):
+                raise TimeoutException(
+                    f"Product title not found within {settings.SCRAPER_EXTRACT_DEADLINE}s"
+                )
+            
+            product_data['title'] = fields['title']
+            product_data['price'] = fields.get('price') or 'Price not found'
+            product_data['image_urls'] = fields.get('image_urls') or []
+            product_data['reviews'] = fields.get('reviews') or []
+            product_data['bytes_transferred'] = drain_transferred_bytes(driver)
+            
+        except TimeoutException as e:
+            product_data['error'] = f"لم يتم تحميل الصفحة خلال الوقت المحدد: {str(e)}"
+            logger.error(f"Timeout Error: {str(e)}")
+        except NoSuchElementException as e:
+            product_data['error'] = f"عنصر مفقود في الصفحة: {str(e)}"
+            logger.error(f"Missing Element: {str(e)}")
+        except WebDriverException as e:
+            # المتصفح تعطل، لذلك لا نعيده إلى المجموعة
+            pool.discard(driver)
+            product_data['error'] = f"خطأ في متصفح Selenium: {str(e)}"
+            logger.error(f"Selenium Error: {str(e)}")
         except Exception as e:
-            logger.error(f"Error closing driver: {str(e)}")
+            product_data['error'] = f"خطأ غير متوقع: {str(e)}"
+            logger.error(f"Critical Error: {str(e)}")
     
     return product_data
 #===========================================
 #===========================================
 #===========================================
-def analyze_product_with_gpt(product_info, max_retries=3):
-    """
-    Analyze product info using GPT-3.5-turbo to generate landing page content
-    """
-    
+GPT_SYSTEM_MESSAGE = "You are a JSON generator. Return ONLY valid JSON matching the exact format provided."
 
-    # Enhanced GPT prompt with strict formatting
-    gpt_prompt = f"""
-    Generate HIGH-CONVERTING landing page content in STRICT JSON format:
-    
-    Product Details:
-    - Title: {product_info.get('title', '')}
-    - Price: {product_info.get('price', '')}
-    - Reviews: {', '.join(product_info.get('reviews', [])[:3])}
-    
-    Required JSON Structure:
-    {{
+GPT_COPY_STRUCTURE = """{
         "headline": "Engaging headline focusing on the benefit (max 50 characters)",
         "subheadline": "Supporting subheadline explaining the main benefit (max 100 characters)",
         "usp": "Unique Selling Proposition (max 20 words)",
@@ -627,70 +876,623 @@ def analyze_product_with_gpt(product_info, max_retries=3):
         "cta": "Call-to-action phrase (3-5 words)",
         "testimonial": "Brief and impactful testimonial (max 20 words)",
         "urgency": "Short phrase to create a sense of urgency (max 10 words)"
-    }}
-    
-    Instructions:
+    }"""
+
+GPT_COPY_INSTRUCTIONS = """Instructions:
     1. Use persuasive marketing language
     2. Focus on emotional triggers
     3. Prioritize mobile-friendly content
-    4. Use the provided product details to create relevant and specific content
+    4. Use the provided product details to create relevant and specific content"""
+
+@functools.lru_cache(maxsize=None)
+def gpt_max_tokens():
+    """
+    حد طول الرد: الرد المطلوب بحجم البنية تقريبًا، مع هامش، ما لم يُحدد في الإعدادات.
+    يُحسب عند أول طلب حتى لا يتم تحميل tiktoken عند الاستيراد.
+    """
+    return settings.GPT_MAX_TOKENS or int(estimate_tokens(GPT_COPY_STRUCTURE) * 1.5) + 50
+
+
+def compact_product_info(product_info):
+    """
+    قص العنوان والمراجعات إلى ميزانية التوكنات المحددة، فالمراجعات الطويلة
+    تزيد حجم الطلب وزمنه دون تحسين النتيجة.
+    """
+    reviews = [review for review in product_info.get('reviews', [])[:3] if review]
+    review_budget = settings.GPT_PROMPT_REVIEWS_TOKENS // max(len(reviews), 1)
+    return {
+        'title': truncate_to_tokens(str(product_info.get('title', '')), settings.GPT_PROMPT_TITLE_TOKENS, GPT_MODEL),
+        'price': product_info.get('price', ''),
+        'reviews': [truncate_to_tokens(review, review_budget, GPT_MODEL) for review in reviews],
+    }
+
+
+def _product_prompt_lines(product_info):
+    product_info = compact_product_info(product_info)
+    return (
+        f"- Title: {product_info['title']}\n"
+        f"    - Price: {product_info['price']}\n"
+        f"    - Reviews: {', '.join(product_info['reviews'])}"
+    )
+
+
+def build_gpt_messages(product_info):
+    """
+    Build the chat messages for the landing page copy prompt.
+    """
+    # Enhanced GPT prompt with strict formatting
+    gpt_prompt = f"""
+    Generate HIGH-CONVERTING landing page content in STRICT JSON format:
+    
+    Product Details:
+    {_product_prompt_lines(product_info)}
+    
+    Required JSON Structure:
+    {GPT_COPY_STRUCTURE}
+    
+    {GPT_COPY_INSTRUCTIONS}
+    """
+    return [
+        {"role": "system", "content": GPT_SYSTEM_MESSAGE},
+        {"role": "user", "content": gpt_prompt}
+    ]
+
+
+def build_gpt_batch_messages(product_infos):
+    """
+    Build one prompt for several products; the answer is keyed by product number.
+    """
+    products = "\n    \n    ".join(
+        f"[{index}]\n    {_product_prompt_lines(product_info)}"
+        for index, product_info in enumerate(product_infos, start=1)
+    )
+    gpt_prompt = f"""
+    Generate HIGH-CONVERTING landing page content for EACH product below in STRICT JSON format:
+    
+    {products}
+    
+    Return ONE JSON object whose keys are the product numbers ("1", "2", ...) and whose
+    values follow this exact structure:
+    {GPT_COPY_STRUCTURE}
+    
+    {GPT_COPY_INSTRUCTIONS}
+    5. Write each product's content from its own details only
+    """
+    return [
+        {"role": "system", "content": GPT_SYSTEM_MESSAGE},
+        {"role": "user", "content": gpt_prompt}
+    ]
+
+
+GPT_REQUIRED_KEYS = [
+    "headline", "subheadline", "usp",
+    "benefits", "cta", "testimonial", "urgency"
+]
+
+
+def parse_gpt_content(raw_content):
+    """
+    Parse the JSON returned by GPT and fill any missing keys.
+    Returns (analyzed_data, complete); complete is False when any key had to be filled,
+    and such partial responses must not be stored in the response cache.
+    Raises json.JSONDecodeError when the content is not valid JSON.
+    """
+    analyzed_data = json.loads(raw_content)
+    logger.debug(f"Analyzed data: {analyzed_data}")
+
+    # Validate response structure
+    complete = True
+    for key in GPT_REQUIRED_KEYS:
+        if key not in analyzed_data:
+            analyzed_data[key] = "Not available"
+            complete = False
+            logger.warning(f"Missing key in GPT response: {key}")
+    return analyzed_data, complete
+
+
+def _product_fields(product_info):
+    return {
+        "title": product_info.get("title", ""),
+        "price": product_info.get("price", ""),
+        "image_urls": product_info.get("image_urls", [])
+    }
+
+
+#================================================
+# الحماية من تعطل OpenAI: قاطع الدائرة والطلبات الاحتياطية
+
+openai_breaker = CircuitBreaker(
+    "openai",
+    failure_threshold=settings.OPENAI_BREAKER_FAILURE_THRESHOLD,
+    window=settings.OPENAI_BREAKER_WINDOW,
+    reset_timeout=settings.OPENAI_BREAKER_RESET_TIMEOUT,
+)
+
+
+def templated_copy(product_info):
+    """
+    نص بديل مبني من بيانات المنتج فقط، يُستخدم عندما يكون OpenAI غير متاح.
     """
+    title = truncate_to_tokens(str(product_info.get('title') or 'This product'), 12, GPT_MODEL)
+    review = next((review for review in product_info.get('reviews', []) if review), "")
+    metrics.increment("gpt.fallback")
+    return {
+        "headline": title[:50],
+        "subheadline": f"Everything you need from {title}"[:100],
+        "usp": "Quality you can count on at a great price",
+        "benefits": ["Trusted by customers", "Great value for money", "Fast and easy ordering"],
+        "cta": "Buy Now",
+        "testimonial": truncate_to_tokens(review, 30, GPT_MODEL),
+        "urgency": "Limited stock available",
+        "fallback": True,
+        **_product_fields(product_info),
+    }
+
+
+get_hedge_executor = lazy_executor("GPT_HEDGE_WORKERS", "gpt-hedge")
+
+
+def _hedge_delay(phase):
+    """
+    متى يُرسل الطلب الثاني: زمن p95 لنفس نوع الطلب (phase)، أو None لتعطيل الطلب الاحتياطي.
+    طلبات الدفعات أبطأ بطبيعتها، لذلك لا تقارن بزمن طلب المنتج الواحد.
+    """
+    if not settings.GPT_HEDGE_ENABLED:
+        return None
+    p95 = metrics.phase_percentile(phase, 95)
+    if p95 is None:
+        return None
+    return max(p95, settings.GPT_HEDGE_MIN_DELAY)
+
+
+def _estimated_usage(messages):
+    """تقدير توكنات المدخلات لطلب أُلغي قبل أن يصل رده (مع usage)."""
+    usage = UsageTotals()
+    usage.prompt_tokens = sum(estimate_tokens(message.get('content') or '', GPT_MODEL) for message in messages)
+    return usage
+
+
+def _create_completion(phase, mode, user=None, items=1, **kwargs):
+    """
+    client.chat.completions.create مع طلب احتياطي إذا تأخر الأول أكثر من p95 لنفس phase.
+    الطلب الخاسر لا يمكن إلغاؤه في العميل المتزامن، لذلك يكتمل في الخلفية ويُسجل استهلاكه
+    كاستدعاء مستقل حتى لا تختفي تكلفته من التقارير.
+    """
+    create = get_openai_client().chat.completions.create
+    delay = _hedge_delay(phase)
+    if delay is None:
+        return create(**kwargs)
+
+    executor = get_hedge_executor()
+    start = time.perf_counter()
+    first = executor.submit(create, **kwargs)
+    try:
+        return first.result(timeout=delay)
+    except concurrent.futures.TimeoutError:
+        pass
+
+    metrics.increment("gpt.hedged")
+    second = executor.submit(create, **kwargs)
+
+    def record_loser(future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        metrics.increment("gpt.hedge_wasted")
+        record_gpt_call(GPT_MODEL, mode, future.result().usage, time.perf_counter() - start, user=user, items=items)
+
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    metrics.increment("gpt.hedge_won")
+                (first if future is second else second).add_done_callback(record_loser)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def _create_completion_async(async_client, phase, mode, user=None, items=1, **kwargs):
+    """
+    نفس _create_completion للمسار غير المتزامن، مع إلغاء الطلب الخاسر.
+    الطلب الملغى قد يُحسب من OpenAI، لذلك تُسجل توكنات مدخلاته تقديريًا.
+    """
+    start = time.perf_counter()
+    first = asyncio.ensure_future(async_client.chat.completions.create(**kwargs))
+    delay = _hedge_delay(phase)
+    if delay is None:
+        return await first
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    metrics.increment("gpt.hedged")
+    second = asyncio.ensure_future(async_client.chat.completions.create(**kwargs))
+    pending = {first, second}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        metrics.increment("gpt.hedge_won")
+                    loser = first if task is second else second
+                    if loser.done() and not loser.cancelled() and loser.exception() is None:
+                        loser_usage = loser.result().usage
+                    elif not loser.done():
+                        loser_usage = _estimated_usage(kwargs['messages'])
+                    else:
+                        loser_usage = None
+                    if loser_usage is not None:
+                        metrics.increment("gpt.hedge_wasted")
+                        await sync_to_async(record_gpt_call)(
+                            GPT_MODEL, mode, loser_usage, time.perf_counter() - start, user=user, items=items,
+                        )
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
 
+
+def analyze_product_with_gpt(product_info, max_retries=3, force_refresh=False, user=None):
+    """
+    Analyze product info using GPT-3.5-turbo to generate landing page content.
+    Identical prompts are answered from the persistent cache unless force_refresh is set.
+    """
+    with metrics.trace("gpt") as trace_fields:
+        return _analyze_product_with_gpt(product_info, max_retries, force_refresh, user, trace_fields)
+
+
+def _analyze_product_with_gpt(product_info, max_retries, force_refresh, user, trace_fields):
+    messages_payload = build_gpt_messages(product_info)
+    product_fields = _product_fields(product_info)
+
+    cache_key = gpt_cache_key(GPT_MODEL, messages_payload, GPT_TEMPERATURE, gpt_max_tokens())
+    if not force_refresh:
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            trace_fields["cache"] = "hit"
+            return {**cached, **product_fields}
+    trace_fields["cache"] = "refresh" if force_refresh else "miss"
+
+    start = time.perf_counter()
+    usage = UsageTotals()
     for attempt in range(max_retries):
+        raw_content = None
+        if not openai_breaker.allow():
+            trace_fields["fallback"] = "breaker"
+            return templated_copy(product_info)
         try:
             # API call with forced JSON response
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a JSON generator. Return ONLY valid JSON matching the exact format provided."
-                    },
-                    {"role": "user", "content": gpt_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500,
-                response_format={"type": "json_object"}
-            )
+            with metrics.span("gpt.call"):
+                response = _create_completion(
+                    "gpt.call", 'sync', user=user,
+                    model=GPT_MODEL,
+                    messages=messages_payload,
+                    temperature=GPT_TEMPERATURE,
+                    max_tokens=gpt_max_tokens(),
+                    response_format={"type": "json_object"}
+                )
+            openai_breaker.record_success()
+            usage.add(response.usage)
 
             # Extract and clean response
             raw_content = response.choices[0].message.content
-            analyzed_data = json.loads(raw_content)
-            logger.debug(f"Analyzed data: {analyzed_data}")
-
-            # Validate response structure
-            required_keys = [
-                "headline", "subheadline", "usp",
-                "benefits", "cta", "testimonial", "urgency"
-            ]
-            
-            for key in required_keys:
-                if key not in analyzed_data:
-                    analyzed_data[key] = "Not available"
-                    logger.warning(f"Missing key in GPT response: {key}")
+            analyzed_data, complete = parse_gpt_content(raw_content)
+            if complete:
+                store_response(cache_key, GPT_MODEL, analyzed_data)
+            record_gpt_call(
+                GPT_MODEL, 'sync', usage, time.perf_counter() - start, attempt, user,
+                truncated=response.choices[0].finish_reason == 'length',
+            )
 
             # Add original product data
-            analyzed_data.update({
-                "title": product_info.get("title", ""),
-                "price": product_info.get("price", ""),
-                "image_urls": product_info.get("image_urls", [])
-            })
-
+            analyzed_data.update(product_fields)
             return analyzed_data
 
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error: {str(e)} - Raw content: {raw_content}")
             if attempt == max_retries - 1:
+                record_gpt_call(GPT_MODEL, 'sync', usage, time.perf_counter() - start, attempt, user, success=False)
                 return {"error": "Failed to parse GPT response"}
+            metrics.increment("gpt.retry")
             time.sleep(2 ** attempt)
 
         except Exception as e:
             logger.error(f"Unexpected error: {str(e)}")
-            if attempt == max_retries - 1:
+            openai_breaker.record_failure()
+            if attempt == max_retries - 1 or openai_breaker.is_open():
+                record_gpt_call(GPT_MODEL, 'sync', usage, time.perf_counter() - start, attempt, user, success=False)
+                if openai_breaker.is_open():
+                    trace_fields["fallback"] = "breaker"
+                    return templated_copy(product_info)
                 return {"error": "Processing failed"}
+            metrics.increment("gpt.retry")
             time.sleep(2 ** attempt)
 
     return {"error": "All attempts failed"}
+
+
+#================================================
+# مسار غير متزامن لتحليل GPT
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_openai_client():
+    """
+    عميل AsyncOpenAI مشترك لكل event loop، مع مجموعة اتصالات محدودة يعاد استخدامها.
+
+    تحت ASGI توجد حلقة واحدة لكل عملية، فتتشارك جميع الطلبات نفس الاتصالات. أما تحت WSGI
+    (الإعداد الحالي، WSGI_APPLICATION) فكل طلب غير متزامن يعمل في حلقة جديدة، لذلك يجب
+    إغلاق العميل عبر close_async_openai_client() في نهاية الطلب حتى لا تتسرب الاتصالات.
+    """
+    import httpx
+    from openai import AsyncOpenAI
+
+    loop = asyncio.get_running_loop()
+    async_client = _async_clients.get(loop)
+    if async_client is None:
+        async_client = AsyncOpenAI(
+            api_key=openai_api_key,
+            base_url=settings.OPENAI_BASE_URL or None,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+                ),
+                timeout=settings.OPENAI_TIMEOUT,
+            ),
+        )
+        _async_clients[loop] = async_client
+    return async_client
+
+
+async def close_async_openai_client():
+    """إغلاق عميل الحلقة الحالية (إن وجد) وإغلاق اتصالاته."""
+    async_client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if async_client is not None:
+        await async_client.close()
+
+
+async def analyze_product_with_gpt_async(product_info, max_retries=3, force_refresh=False, user=None):
+    """
+    نفس analyze_product_with_gpt لكن دون حجز خيط أثناء انتظار OpenAI أو فترات إعادة المحاولة.
+    """
+    with metrics.trace("gpt", mode="async") as trace_fields:
+        messages_payload = build_gpt_messages(product_info)
+        product_fields = _product_fields(product_info)
+
+        cache_key = gpt_cache_key(GPT_MODEL, messages_payload, GPT_TEMPERATURE, gpt_max_tokens())
+        if not force_refresh:
+            cached = await sync_to_async(get_cached_response)(cache_key)
+            if cached is not None:
+                trace_fields["cache"] = "hit"
+                return {**cached, **product_fields}
+        trace_fields["cache"] = "refresh" if force_refresh else "miss"
+
+        async_client = get_async_openai_client()
+        start = time.perf_counter()
+        usage = UsageTotals()
+        for attempt in range(max_retries):
+            raw_content = None
+            if not await sync_to_async(openai_breaker.allow)():
+                trace_fields["fallback"] = "breaker"
+                return templated_copy(product_info)
+            try:
+                with metrics.span("gpt.call"):
+                    response = await _create_completion_async(
+                        async_client, "gpt.call", 'async', user=user,
+                        model=GPT_MODEL,
+                        messages=messages_payload,
+                        temperature=GPT_TEMPERATURE,
+                        max_tokens=gpt_max_tokens(),
+                        response_format={"type": "json_object"}
+                    )
+                await sync_to_async(openai_breaker.record_success)()
+                usage.add(response.usage)
+                raw_content = response.choices[0].message.content
+                analyzed_data, complete = parse_gpt_content(raw_content)
+                if complete:
+                    await sync_to_async(store_response)(cache_key, GPT_MODEL, analyzed_data)
+                await sync_to_async(record_gpt_call)(
+                    GPT_MODEL, 'async', usage, time.perf_counter() - start, attempt, user,
+                    truncated=response.choices[0].finish_reason == 'length',
+                )
+
+                analyzed_data.update(product_fields)
+                return analyzed_data
+
+            except json.JSONDecodeError as e:
+                logger.error(f"JSON decode error: {str(e)} - Raw content: {raw_content}")
+                if attempt == max_retries - 1:
+                    await sync_to_async(record_gpt_call)(
+                        GPT_MODEL, 'async', usage, time.perf_counter() - start, attempt, user, success=False
+                    )
+                    return {"error": "Failed to parse GPT response"}
+                metrics.increment("gpt.retry")
+                await asyncio.sleep(2 ** attempt)
+
+            except Exception as e:
+                logger.error(f"Unexpected error: {str(e)}")
+                await sync_to_async(openai_breaker.record_failure)()
+                breaker_open = await sync_to_async(openai_breaker.is_open)()
+                if attempt == max_retries - 1 or breaker_open:
+                    await sync_to_async(record_gpt_call)(
+                        GPT_MODEL, 'async', usage, time.perf_counter() - start, attempt, user, success=False
+                    )
+                    if breaker_open:
+                        trace_fields["fallback"] = "breaker"
+                        return templated_copy(product_info)
+                    return {"error": "Processing failed"}
+                metrics.increment("gpt.retry")
+                await asyncio.sleep(2 ** attempt)
+
+        return {"error": "All attempts failed"}
+
+
+def stream_product_copy_with_gpt(product_info, force_refresh=False, user=None):
+    """
+    نسخة متدفقة من التحليل: تعطي {"event": "field"} لكل حقل فور اكتماله، ثم
+    {"event": "done"} بالنتيجة الكاملة أو {"event": "failed"} عند الخطأ.
+    لا توجد إعادة محاولة هنا لأن جزءًا من النتيجة يكون قد أُرسل للمستخدم.
+    """
+    messages_payload = build_gpt_messages(product_info)
+    product_fields = _product_fields(product_info)
+    cache_key = gpt_cache_key(GPT_MODEL, messages_payload, GPT_TEMPERATURE, gpt_max_tokens())
+
+    if not force_refresh:
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            for key in GPT_REQUIRED_KEYS:
+                yield {"event": "field", "key": key, "value": cached.get(key)}
+            yield {"event": "done", "data": {**cached, **product_fields}}
+            return
+
+    if not openai_breaker.allow():
+        fallback = templated_copy(product_info)
+        for key in GPT_REQUIRED_KEYS:
+            yield {"event": "field", "key": key, "value": fallback.get(key)}
+        yield {"event": "done", "data": fallback}
+        return
+
+    start = first_field_start = time.perf_counter()
+    usage = UsageTotals()
+    finish_reason = None
+    parser = JSONObjectStream()
+    chunks = []
+    try:
+        with metrics.span("gpt.stream"):
+            stream = get_openai_client().chat.completions.create(
+                model=GPT_MODEL,
+                messages=messages_payload,
+                temperature=GPT_TEMPERATURE,
+                max_tokens=gpt_max_tokens(),
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            openai_breaker.record_success()
+            for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    usage.add(chunk.usage)
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                if not chunk.choices[0].delta.content:
+                    continue
+                chunks.append(chunk.choices[0].delta.content)
+                for key, value in parser.feed(chunks[-1]):
+                    if first_field_start is not None:
+                        metrics.record("gpt.first_field", time.perf_counter() - first_field_start)
+                        first_field_start = None
+                    yield {"event": "field", "key": key, "value": value}
+        analyzed_data, complete = parse_gpt_content("".join(chunks))
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error in stream: {str(e)} - Raw content: {''.join(chunks)}")
+        record_gpt_call(GPT_MODEL, 'stream', usage, time.perf_counter() - start, user=user, success=False)
+        yield {"event": "failed", "error": "Failed to parse GPT response"}
+        return
+    except Exception as e:
+        logger.error(f"Streaming error: {str(e)}")
+        openai_breaker.record_failure()
+        record_gpt_call(GPT_MODEL, 'stream', usage, time.perf_counter() - start, user=user, success=False)
+        yield {"event": "failed", "error": "Processing failed"}
+        return
+
+    record_gpt_call(
+        GPT_MODEL, 'stream', usage, time.perf_counter() - start, user=user,
+        truncated=finish_reason == 'length',
+    )
+    if complete:
+        store_response(cache_key, GPT_MODEL, analyzed_data)
+    analyzed_data.update(product_fields)
+    yield {"event": "done", "data": analyzed_data}
+
+
+def analyze_products_with_gpt_batch(product_infos, force_refresh=False, user=None):
+    """
+    تحليل عدة منتجات في طلب واحد إلى GPT، مع رد مفهرس برقم كل منتج.
+
+    ترجع قائمة بنفس ترتيب المدخلات. المنتجات الموجودة في الذاكرة المؤقتة لا تُرسل،
+    والمنتجات التي يفشل التحقق من ردها فقط تُحلل بطلبات فردية.
+    """
+    results = [None] * len(product_infos)
+    cache_keys = [
+        gpt_cache_key(GPT_MODEL, build_gpt_messages(product_info), GPT_TEMPERATURE, gpt_max_tokens())
+        for product_info in product_infos
+    ]
+
+    pending = []
+    for index, (product_info, cache_key) in enumerate(zip(product_infos, cache_keys)):
+        cached = None if force_refresh else get_cached_response(cache_key)
+        if cached is not None:
+            results[index] = {**cached, **_product_fields(product_info)}
+        else:
+            pending.append(index)
+
+    for start in range(0, len(pending), settings.GPT_BATCH_SIZE):
+        batch = pending[start:start + settings.GPT_BATCH_SIZE]
+        items = _request_gpt_batch([product_infos[index] for index in batch], user) if len(batch) > 1 else {}
+
+        for position, index in enumerate(batch, start=1):
+            item = items.get(str(position))
+            if isinstance(item, dict) and all(key in item for key in GPT_REQUIRED_KEYS):
+                analyzed_data = {key: item[key] for key in GPT_REQUIRED_KEYS}
+                # الحفظ بمفتاح الطلب الفردي حتى تستفيد منه التحليلات اللاحقة لنفس المنتج
+                store_response(cache_keys[index], GPT_MODEL, analyzed_data)
+                results[index] = {**analyzed_data, **_product_fields(product_infos[index])}
+            else:
+                if len(batch) > 1:
+                    metrics.increment("gpt.batch_fallback")
+                results[index] = analyze_product_with_gpt(
+                    product_infos[index], force_refresh=force_refresh, user=user
+                )
+
+    return results
+
+
+def _request_gpt_batch(product_infos, user=None):
+    """طلب واحد لعدة منتجات؛ ترجع {رقم المنتج: الرد} أو {} عند الفشل."""
+    raw_content = None
+    response = None
+    if not openai_breaker.allow():
+        # المنتجات ستُحلل فرديًا، وهناك يتم إرجاع النص البديل
+        return {}
+    start = time.perf_counter()
+    try:
+        with metrics.span("gpt.batch_call"):
+            response = _create_completion(
+                "gpt.batch_call", 'batch', user=user, items=len(product_infos),
+                model=GPT_MODEL,
+                messages=build_gpt_batch_messages(product_infos),
+                temperature=GPT_TEMPERATURE,
+                max_tokens=min(gpt_max_tokens() * len(product_infos), settings.GPT_BATCH_MAX_TOKENS),
+                response_format={"type": "json_object"}
+            )
+        openai_breaker.record_success()
+        raw_content = response.choices[0].message.content
+        items = json.loads(raw_content)
+        record_gpt_call(
+            GPT_MODEL, 'batch', response.usage, time.perf_counter() - start, user=user,
+            truncated=response.choices[0].finish_reason == 'length', items=len(product_infos),
+        )
+        return items if isinstance(items, dict) else {}
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error in batch: {str(e)} - Raw content: {raw_content}")
+    except Exception as e:
+        logger.error(f"Batch analysis failed: {str(e)}")
+        openai_breaker.record_failure()
+    record_gpt_call(
+        GPT_MODEL, 'batch', getattr(response, 'usage', None), time.perf_counter() - start,
+        user=user, success=False, items=len(product_infos),
+    )
+    return {}
     #==========================================
         #===========================================
 def is_valid_url(url):
@@ -712,10 +1514,27 @@ def product_preview(request):
     """
     عرض صفحة معاينة المنتج مع إمكانية التعديل على البيانات المخزنة في الجلسة.
     """
+    # إذا كانت هناك مهمة تحليل جارية، عرض صفحة الانتظار
+    job_id = request.GET.get('job')
+    if job_id:
+        try:
+            job = ProductAnalysisJob.objects.get(pk=job_id, user=request.user)
+        except (ProductAnalysisJob.DoesNotExist, ValidationError):
+            raise Http404("Job not found")
+        if job.status == ProductAnalysisJob.STATUS_FAILED:
+            messages.error(request, f"خطأ في التحليل: {job.error}")
+            return redirect('product_selection')
+        if job.status != ProductAnalysisJob.STATUS_DONE:
+            return render(request, 'product_preview.html', {
+                'job': job,
+                'poll_interval_ms': settings.PRODUCT_JOB_POLL_INTERVAL_MS,
+            })
+        _store_job_result(request, job)
+
     # جلب بيانات المنتج من الجلسة
     product_details = request.session.get('product_details', {})
 
-    # إذا كانت البيانات فارغة، توليد بيانات افتراضية باستخدام GPT
+    # إذا كانت البيانات فارغة، استخدام نص افتراضي جاهز
     if not product_details:
         try:
             product_details = generate_default_product_details()
@@ -749,18 +1568,36 @@ def product_preview(request):
     # عرض صفحة معاينة المنتج
     print(f"Final Product Details Sent to Template: {product_details}")  # Debug
     return render(request, 'product_preview.html', {
-        'product_details': product_details
+        'product_details': product_details,
+        'image_gallery': build_image_gallery(product_details),
     })
 
 
+def build_image_gallery(product_details):
+    """
+    ربط كل صورة بمعلومات srcset الخاصة بها (إن تم نسخها محليًا) لعرضها في القالب.
+    """
+    variants = {
+        variant.get('src'): variant
+        for variant in product_details.get('image_variants', [])
+        if isinstance(variant, dict)
+    }
+    return [
+        {'url': url, **variants.get(url, {})}
+        for url in product_details.get('image_urls', [])
+    ]
+
+
 #==============================================================
 def generate_default_product_details():
     """
-    توليد بيانات افتراضية للمنتج باستخدام GPT.
+    بيانات افتراضية للمنتج من مجموعة نصوص جاهزة (build_default_copy_pool)، دون استدعاء GPT.
+    التوليد المباشر يتم فقط عندما يطلبه المستخدم من زر "Generate copy live".
     """
-    gpt_data = analyze_product_with_gpt("https://example.com/product")
+    gpt_data = pick_default_copy()
     return {
         'link': "https://example.com/buy-now",
+        'title': gpt_data.get('title', 'Sample Product'),
         'price': gpt_data.get('price', '99.99'),
         'headline': gpt_data.get('headline', 'Default Headline'),
         'subheadline': gpt_data.get('subheadline', 'Default Subheadline'),
@@ -768,6 +1605,7 @@ def generate_default_product_details():
         'benefits': gpt_data.get('benefits', ['Benefit 1', 'Benefit 2']),
         'cta': gpt_data.get('cta', 'Buy Now'),
         'urgency': gpt_data.get('urgency', 'Limited Time Offer!'),
+        'testimonial': gpt_data.get('testimonial', ''),
         'testimonials': [],
         'image_urls': [],
         'slug': create_unique_slug(gpt_data.get('headline', 'default-title'))
@@ -874,6 +1712,7 @@ def landing_page_preview(request):
                 testimonials=form_data['testimonials'],
                 urgency=form_data['urgency'],
                 image_urls=product_details_session.get('image_urls', []),
+                image_variants=product_details_session.get('image_variants', []),
                 is_published=False,
                 slug=create_unique_slug(form_data['headline'])  # استخدام الدالة الموجودة
             )
@@ -955,6 +1794,7 @@ def save_landing_page(request):
                 cta=request.POST.get('cta'),
                 urgency=request.POST.get('urgency'),
                 image_urls=product_details.get('image_urls', []),
+                image_variants=product_details.get('image_variants', []),
                 slug=create_unique_slug(request.POST.get('headline'))
             )
             
@@ -989,7 +1829,10 @@ def get_landing_page(request, slug):
             "urgency": landing_page.urgency,
             "hero_image": landing_page.hero_image.url if landing_page.hero_image else None,
         }
-        return JsonResponse(data)
+        return conditional_landing_page(
+            request, landing_page_etag('api', data), landing_page.updated_at, landing_page.is_published,
+            lambda: JsonResponse(data),
+        )
     except LandingPage.DoesNotExist:
         print(f"Landing page not found for slug: {slug}")
         return JsonResponse({"error": "Landing page not found"}, status=404)
@@ -997,6 +1840,72 @@ def get_landing_page(request, slug):
         print(f"Error in get_landing_page: {str(e)}")
         return JsonResponse({"error": str(e)}, status=500)
 
+
+# الحقول المسموح بطلبها عبر ?fields= في واجهة الجلب المجمع
+LANDING_PAGE_API_FIELDS = (
+    'slug', 'title', 'description', 'price', 'usp', 'benefits', 'cta', 'urgency', 'purchase_url',
+    'hero_image', 'image_urls', 'image_variants', 'is_published', 'created_at', 'updated_at',
+)
+LANDING_PAGE_API_DEFAULT_FIELDS = (
+    'slug', 'title', 'description', 'price', 'usp', 'benefits', 'purchase_url', 'urgency', 'hero_image',
+)
+
+
+def get_landing_pages(request):
+    """
+    جلب عدة صفحات هبوط بطلب واحد واستعلام واحد، بدل طلب لكل صفحة.
+
+    ?slugs=a,b,c أو ?mine=1 لصفحات المستخدم، مع ?fields=title,price لتحديد الحقول
+    و?cursor=<next> للصفحة التالية. المسودات تظهر لصاحبها فقط.
+    """
+    fields = list(dict.fromkeys(name for name in request.GET.get('fields', '').split(',') if name)) or list(LANDING_PAGE_API_DEFAULT_FIELDS)
+    unknown = [name for name in fields if name not in LANDING_PAGE_API_FIELDS]
+    if unknown:
+        return JsonResponse({"error": f"Unknown fields: {', '.join(unknown)}"}, status=400)
+
+    try:
+        limit = min(int(request.GET.get('limit', settings.LANDING_PAGE_API_PAGE_SIZE)), settings.LANDING_PAGE_API_MAX_PAGE_SIZE)
+        cursor = int(request.GET['cursor']) if request.GET.get('cursor') else None
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit or cursor"}, status=400)
+    if limit < 1:
+        return JsonResponse({"error": "Invalid limit or cursor"}, status=400)
+
+    if request.user.is_authenticated:
+        pages = LandingPage.objects.filter(Q(user=request.user) | Q(is_published=True))
+    else:
+        pages = LandingPage.objects.filter(is_published=True)
+
+    if request.GET.get('mine') == '1':
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        pages = pages.filter(user=request.user)
+    else:
+        slugs = [slug for slug in request.GET.get('slugs', '').split(',') if slug]
+        if not slugs:
+            return JsonResponse({"error": "Pass slugs=... or mine=1"}, status=400)
+        if len(slugs) > settings.LANDING_PAGE_API_MAX_PAGE_SIZE:
+            return JsonResponse({"error": f"At most {settings.LANDING_PAGE_API_MAX_PAGE_SIZE} slugs per request"}, status=400)
+        pages = pages.filter(slug__in=slugs)
+
+    # ترتيب ثابت حسب id تنازليًا (الأحدث أولًا)، والمؤشر هو آخر id في الصفحة السابقة
+    if cursor is not None:
+        pages = pages.filter(pk__lt=cursor)
+    rows = list(pages.order_by('-pk').values('pk', *fields)[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = str(rows[-1]['pk']) if has_more else None
+    for row in rows:
+        del row['pk']
+        if 'hero_image' in row:
+            row['hero_image'] = default_storage.url(row['hero_image']) if row['hero_image'] else None
+
+    return JsonResponse(
+        {"results": rows, "next": next_cursor},
+        json_dumps_params={"ensure_ascii": False, "separators": (",", ":")},
+    )
+
 # ============================
 # حذف الصور
 # ============================
@@ -1092,14 +2001,17 @@ def create_unique_slug(title):
 def publish_landing_page(request, slug):
     try:
         landing_page = get_object_or_404(LandingPage, slug=slug, user=request.user)
-        if landing_page.is_published:
-            messages.warning(request, "الصفحة منشورة بالفعل!")
-            return redirect('dashboard')
         if request.method == "POST":
+            # إعادة النشر مسموحة: تعيد إنشاء الملف الثابت بعد تعديل الصفحة
+            republished = landing_page.is_published
             landing_page.is_published = True
+            # post_save يجدول إعادة إنشاء النسخة الثابتة في الخلفية (landing_page_export_saved)
             landing_page.save()
-            messages.success(request, "تم نشر الصفحة بنجاح!")
-            return redirect('public_landing_page', slug=slug)
+            messages.success(request, "تم تحديث الصفحة المنشورة!" if republished else "تم نشر الصفحة بنجاح!")
+            return redirect('landing_page_preview_with_slug', slug=slug)
+        if landing_page.is_published:
+            messages.warning(request, "الصفحة منشورة بالفعل!")
+            return redirect('dashboard')
         return redirect('landing_page_preview_with_slug', slug=slug)
     except Exception as e:
         logger.error(f"خطأ في النشر: {str(e)}")
@@ -1110,33 +2022,51 @@ def publish_landing_page(request, slug):
 #====================================================
 #================================================
 
-@login_required
+def _render_published_landing_page(request, slug):
+    landing_page = LandingPage.objects.filter(slug=slug, is_published=True).first()
+    if landing_page is None:
+        return None
+    landing_page_data = landing_page_fields(landing_page)
+    return conditional_landing_page(
+        request, landing_page_etag('html', landing_page_data), landing_page.updated_at, True,
+        lambda: render(request, 'landing_page_preview.html', {'landing_page': landing_page_data}),
+    )
+
+
 def landing_page_preview_with_slug(request, slug):
-    """عرض صفحة الهبوط أو إرجاع بيانات JSON"""
+    """
+    عرض صفحة الهبوط أو إرجاع بيانات JSON.
+    الصفحات المنشورة متاحة للجميع، والمسودات لصاحبها فقط.
+    """
+    is_json = request.headers.get('Accept') == 'application/json'
+    if not request.user.is_authenticated:
+        if is_json:
+            return redirect_to_login(request.get_full_path())
+        # زيارات الإعلانات: نفس HTML لكل زائر غير مسجل، لذلك يُقدم من الذاكرة المؤقتة
+        response = cached_landing_page(request, slug, lambda: _render_published_landing_page(request, slug))
+        return response or redirect_to_login(request.get_full_path())
+
     try:
         # الحصول على صفحة الهبوط بناءً على slug
-        landing_page = get_object_or_404(LandingPage, slug=slug, user=request.user)
+        landing_page = get_object_or_404(
+            LandingPage.objects.filter(Q(user=request.user) | Q(is_published=True)), slug=slug
+        )
 
         # إعداد البيانات المشتركة
-        landing_page_data = {
-            'title': landing_page.title,
-            'description': landing_page.description,
-            'purchase_url': landing_page.purchase_url,
-            'price': landing_page.price,
-            'usp': landing_page.usp,
-            'benefits': landing_page.benefits,
-            'cta': landing_page.cta,
-            'urgency': landing_page.urgency,
-            'image_urls': landing_page.image_urls,
-            'slug': landing_page.slug
-        }
+        landing_page_data = landing_page_fields(landing_page)
 
         # إذا كان الطلب JSON، إرجاع البيانات
-        if request.headers.get('Accept') == 'application/json':
-            return JsonResponse(landing_page_data, safe=False)
+        if is_json:
+            build = lambda: JsonResponse(landing_page_data, safe=False)
+            etag = landing_page_etag('json', landing_page_data)
+        else:
+            # إذا لم يكن الطلب JSON، عرض صفحة HTML
+            build = lambda: render(request, 'landing_page_preview.html', {'landing_page': landing_page_data})
+            # قد يختلف HTML حسب المستخدم المسجل
+            etag = landing_page_etag(f'html:{request.user.pk}', landing_page_data)
 
-        # إذا لم يكن الطلب JSON، عرض صفحة HTML
-        return render(request, 'landing_page_preview.html', {'landing_page': landing_page_data})
+        # العرض لمستخدم مسجل خاص به دائمًا، حتى للصفحات المنشورة
+        return conditional_landing_page(request, etag, landing_page.updated_at, False, build)
 
     except Exception as e:
         # إرجاع خطأ JSON في حالة الطلب JSON
@@ -1167,6 +2097,7 @@ def save_landing_page(request):
                 cta=request.POST.get('cta'),
                 urgency=request.POST.get('urgency'),
                 image_urls=product_details.get('image_urls', []),
+                image_variants=product_details.get('image_variants', []),
                 slug=create_unique_slug(request.POST.get('headline'))
             )
             